@@ -1,95 +1,156 @@
+import copy
 import json
+import os
+import time
+import datetime
 import google.generativeai as genai
 
+from catalog import load_catalog, load_emag_data, normalize_prompt
+from intent_parser import parse_intent
+from cache_store import filters_cache
+from session_store import sessions, DEFAULT_SESSION
+from resilience import (
+    call_with_retry, breaker_for,
+    LLM_RETRY_ATTEMPTS, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY
+)
+
 API_KEY = "AIzaSyCw2Vdd4-BOvk4g4y-hG8efxsGC08rNU90aaaaaaa"
 genai.configure(api_key=API_KEY)
 
+MODEL_NAME = "gemini-2.5-flash-lite"
 
-def load_emag_data():
-    with open("emag_filters_and_categories.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+# Cât timp păstrăm prefixul static în context cache-ul Gemini
+PROMPT_CACHE_TTL = datetime.timedelta(hours=1)
 
+# Cheile cache-ului de filtre trec și prin stemming ("tricouri galbene" = "tricou galben")
+FILTERS_CACHE_STEM = os.getenv("FILTERS_CACHE_STEM", "1") != "0"
 
-def build_ai_prompt(user_prompt, emag_data):
-    # extragem automat pattern-urile din JSON
-    url_examples = []
 
-    for fname, items in emag_data["filters"].items():
-        for it in items:
-            url_examples.append(it["url_path"])
+# ==========================================================
+#   CATALOG COMPACT (construit o singură dată per catalog)
+# ==========================================================
 
-    # pattern dedus automat:
-    # - orice apare între "/label/" și "/<context>" este un filtru valid
-    # - filtrul de preț este detectabil pentru că are forma pret,intre-X-si-Y
+def compact_catalog(catalog):
+    """
+    Catalogul într-o formă compactă pentru model: doar numele categoriilor
+    și etichetele opțiunilor, fără indentare, fără url_path / value_id /
+    count (URL-ul îl construiește url_builder din etichete).
 
-    auto_patterns = """
-Acestea sunt toate pattern-urile reale extrase automat din HTML-ul eMAG:
+        CATEGORII: Blugi barbati|Camasi barbati|...
+        Culoare: Alb|Albastru|...
 
-{}
-    
-Observații:
-- Orice filtru are structura: /label/<ceva>/<context>
-- Filtre multiple se unesc cu: /filter/A/B/C
-- Prețul are forma observată: pret,intre-<min>-si-<max>
-- Rating-ul are forma observată: rating,star-<min>
-""".format(
-        "\n".join(url_examples)
-    )
+    Etichetele țin loc de ID-uri scurte de opțiune, intenționat: modelul
+    trebuie să vadă eticheta ca să potrivească cererea, deci un ID ar veni
+    în plus pe lângă ea ("c3=Negru"), iar catalogul ar crește. Etichetele
+    au deja 1-3 tokeni, iar url_builder le traduce direct în slug-uri.
+    """
+    categories = list(dict.fromkeys(c["name"] for c in catalog.categories))
+    lines = ["CATEGORII: " + "|".join(categories), "FILTRE:"]
+    for fname, items in catalog.filters.items():
+        lines.append(f"{fname}: " + "|".join(it["label"] for it in items))
+    return "\n".join(lines)
 
-    return f"""
-Ești un agent specializat în generarea URL-urilor corecte pentru eMAG.ro.
-
-Ai acces la tot dump-ul brut de categorii și filtre extras din HTML:
-CATEGORII:
-{json.dumps(emag_data["categories"], indent=2, ensure_ascii=False)}
-
-FILTRE:
-{json.dumps(emag_data["filters"], indent=2, ensure_ascii=False)}
-
-PATTERN-URI DEDUSE AUTOMAT DIN HTML:
-{auto_patterns}
-
-REGULILE INVĂȚATE AUTOMAT:
-1. Toate filtrele respectă SEF-ul furnizat în url_path
-2. Dacă un filtru nu există în JSON, îl deduci logic din pattern-uri
-3. PREȚUL trebuie interpretat cu formula:
-   /label/pret,intre-<min>-si-<max>/
-4. Pentru rating:
-   /label/rating,star-<min>/
-5. Tu ești responsabil să găsești categoria potrivită, să extragi toate filtrele relevante și să construiești doar structura JSON finală.
-
-TREBUIE SĂ RETURNZI STRICT JSON-ul:
-
-{{
-  "category": "<exact category name>",
-  "filters": [
-      {{
-         "filter_name": "Pret",
-         "min": 50,
-         "max": 200
-      }},
-      {{
-         "filter_name": "Culoare",
-         "option_label": "Negru"
-      }}
-  ]
-}}
-
-NU returna text explicativ.
-NU returna alte câmpuri.
-
-Cerința utilizatorului este:
-\"{user_prompt}\"
-"""
 
+OUTPUT_FORMAT = """TREBUIE SĂ RETURNZI STRICT JSON-ul (fără text explicativ, fără alte câmpuri):
+{"category": "<exact category name>", "filters": [{"filter_name": "Pret", "min": 50, "max": 200}, {"filter_name": "Culoare", "option_label": "Negru"}]}
+- category: exact unul din CATEGORII
+- filter_name / option_label: exact ca în FILTRE
+- Pret: "min"/"max" numerice; Rating: "min" = numărul minim de stele"""
 
-def ai_select_filters(user_prompt):
-    emag_data = load_emag_data()
-    prompt = build_ai_prompt(user_prompt, emag_data)
 
-    model = genai.GenerativeModel("gemini-2.5-flash-lite")
-    response = model.generate_content(prompt)
+def build_select_instructions(catalog):
+    return f"""Ești un agent specializat în alegerea categoriei și filtrelor eMAG.ro.
+
+Catalogul disponibil (categorii și opțiunile fiecărui filtru):
+{compact_catalog(catalog)}
+
+REGULI:
+1. Tu ești responsabil să găsești categoria potrivită și să extragi toate filtrele relevante.
+2. Folosește doar opțiuni care există în catalog.
+3. PREȚUL se dă ca interval: filtrul "Pret" cu "min" și "max".
+
+{OUTPUT_FORMAT}"""
+
+
+def build_refine_instructions(catalog):
+    return f"""Ești un agent specializat în ACTUALIZAREA unui JSON de filtre pentru eMAG.ro.
+
+Catalogul disponibil (categorii și opțiunile fiecărui filtru):
+{compact_catalog(catalog)}
+
+REGULILE:
+1. Categoria NU se schimbă decât dacă utilizatorul cere explicit o altă categorie.
+   Exemple: cere schimbare de categorie:
+     - "nu mai vreau tricouri, vreau blugi"
+     - "caut pantaloni"
+     - "vreau haine pentru femei"
+   Dacă utilizatorul NU cere clar o categorie nouă, păstrezi categoria EXACT cum este în JSON-ul curent.
+2. Filtrele se actualizează doar cu ce cere utilizatorul.
+3. Dacă utilizatorul spune clar că vrea ceva complet diferit
+   (ex: "schimb tot", "vreau altceva", "reset", "sterge tot", "de la zero"),
+   IGNORI JSON-ul curent și generezi unul NOU de la zero.
+4. Daca in mesajul user-ului apare "si", adaugi noua caracteristica la filtrele curente.
+5. PREȚUL se dă ca interval: filtrul "Pret" cu "min" și "max".
+
+{OUTPUT_FORMAT}"""
+
 
+# Prefixele statice, construite o dată per versiune de catalog:
+# kind -> (catalog, instructions, model, expires_at)
+_static_prompts = {}
+
+INSTRUCTION_BUILDERS = {
+    "select": build_select_instructions,
+    "refine": build_refine_instructions,
+}
+
+
+def _create_model(instructions):
+    """
+    Model cu prefixul static în context cache (plătit o singură dată per TTL);
+    dacă API-ul/modelul nu suportă caching (ex: prefix sub minimul de tokeni),
+    îl trimitem ca system_instruction.
+    """
+    try:
+        cached = genai.caching.CachedContent.create(
+            model=f"models/{MODEL_NAME}",
+            system_instruction=instructions,
+            ttl=PROMPT_CACHE_TTL,
+        )
+        model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        return model, time.time() + PROMPT_CACHE_TTL.total_seconds() - 60
+    except Exception as e:
+        print("[AI] Context caching indisponibil, folosim system_instruction:", e)
+        return genai.GenerativeModel(MODEL_NAME, system_instruction=instructions), None
+
+
+def get_model(kind):
+    catalog = load_catalog()
+    entry = _static_prompts.get(kind)
+
+    if entry is None or entry[0] is not catalog or (entry[3] is not None and time.time() >= entry[3]):
+        instructions = INSTRUCTION_BUILDERS[kind](catalog)
+        model, expires_at = _create_model(instructions)
+        entry = (catalog, instructions, model, expires_at)
+        _static_prompts[kind] = entry
+
+    return entry[2]
+
+
+def generate(kind, prompt):
+    """
+    generate_content cu retry (backoff exponențial cu jitter) pentru erorile
+    trecătoare (429, timeout, 5xx) și circuit breaker: dacă Gemini e căzut,
+    eșuăm imediat cu CircuitOpen în loc să așteptăm la fiecare cerere.
+    """
+    return call_with_retry(
+        lambda: get_model(kind).generate_content(prompt),
+        breaker_for("gemini"),
+        attempts=LLM_RETRY_ATTEMPTS, base=LLM_RETRY_BASE_DELAY, cap=LLM_RETRY_MAX_DELAY,
+    )
+
+
+def parse_model_json(response, error_label):
     # Extragere text corectă
     raw = response.candidates[0].content.parts[0].text.strip()
 
@@ -98,162 +159,138 @@ def ai_select_filters(user_prompt):
 
     # Parsare JSON
     try:
-        ai_output = json.loads(raw)
+        return json.loads(raw)
     except Exception as e:
-        print("NU AM PUTUT PARSA JSON:\n", raw)
+        print(f"{error_label}:\n", raw)
         raise e
 
+
+# ==========================================================
+#   CACHE PROMPT -> FILTRE
+# ==========================================================
+
+def canonical_state(state):
+    """JSON-ul curent într-o formă stabilă (ordinea cheilor/filtrelor nu contează)."""
+    filters = sorted(
+        json.dumps(f, ensure_ascii=False, sort_keys=True) for f in state.get("filters", [])
+    )
+    return json.dumps([state.get("category"), filters], ensure_ascii=False, separators=(",", ":"))
+
+
+def is_valid_output(ai_output):
+    """Păstrăm în cache doar răspunsuri cu o categorie existentă și o listă de filtre."""
+    return (
+        isinstance(ai_output, dict)
+        and isinstance(ai_output.get("category"), str)
+        and load_catalog().find_category(ai_output["category"]) is not None
+        and isinstance(ai_output.get("filters"), list)
+    )
+
+
+def cached_ai_call(key, call):
+    """
+    Rezultatul validat din filters_cache pentru `key`, altfel apelează modelul.
+    Întoarcem mereu o copie: apelanții modifică JSON-ul (ex: categoria).
+    """
+    cached = filters_cache.get(key)
+    if cached is not None:
+        print("[AI] Filtre din cache:", key)
+        return copy.deepcopy(cached)
+
+    ai_output = call()
+    if is_valid_output(ai_output):
+        filters_cache.set(key, copy.deepcopy(ai_output))
     return ai_output
 
 
+# ==========================================================
+#   SELECȚIE INIȚIALĂ
+# ==========================================================
+
+def build_ai_prompt(user_prompt, emag_data=None):
+    """Partea variabilă a cererii (prefixul static e în get_model("select"))."""
+    return f'Cerința utilizatorului este:\n"{user_prompt}"'
+
+
+def ai_select_filters(user_prompt):
+    # Cererile simple ("tricou galben", "blugi sub 200 lei") le rezolvăm
+    # local din catalog; modelul e apelat doar pentru cele ambigue.
+    local = parse_intent(user_prompt)
+    if local is not None:
+        print("[AI] Filtre extrase local:", local)
+        return local
+
+    def call():
+        response = generate("select", build_ai_prompt(user_prompt))
+        return parse_model_json(response, "NU AM PUTUT PARSA JSON")
+
+    key = "select|" + normalize_prompt(user_prompt, stem=FILTERS_CACHE_STEM)
+    return cached_ai_call(key, call)
+
+
 # ==========================================================
 #   SUPORT PENTRU CONVERSAȚIE (context + rafinare filtre)
 # ==========================================================
 
-# Starea curentă a conversației (ultimul JSON generat)
-conversation_state = None  # {"category": "...", "filters": [...]}
+# Starea fiecărei conversații (ultimul JSON generat) stă în `sessions`,
+# indexată după ID-ul de sesiune al clientului:
+#   session_id -> {"category": "...", "filters": [...]}
 
 
-def reset_conversation():
+def get_conversation_state(session_id=DEFAULT_SESSION):
+    return sessions.get(session_id)
+
+
+def reset_conversation(session_id=DEFAULT_SESSION):
     """
     Resetează contextul conversației (categoria și filtrele curente).
     """
-    global conversation_state
-    conversation_state = None
+    sessions.delete(session_id)
 
 
-def start_conversation(user_prompt):
+def start_conversation(user_prompt, session_id=DEFAULT_SESSION):
     """
     Pornește o conversație nouă:
     - întoarce un mesaj "cald" (explicativ)
     - întoarce JSON-ul inițial (category + filters)
     """
-    global conversation_state
-
     warm_message = (
         f'Am înțeles: "{user_prompt}". '
         "Aleg categoria potrivită și filtrele de pe eMAG pentru tine..."
     )
 
     ai_output = ai_select_filters(user_prompt)
-    conversation_state = ai_output
-    print(conversation_state)
+    sessions.set(session_id, ai_output)
+    print(ai_output)
     return warm_message, ai_output
 
 
-def build_refine_prompt(user_message, current_state, emag_data):
+def build_refine_prompt(user_message, current_state, emag_data=None):
     """
-    Construiește prompt-ul pentru rafinarea JSON-ului existent.
+    Partea variabilă a cererii de rafinare: starea curentă (JSON compact)
+    și mesajul nou. Prefixul static e în get_model("refine").
     """
-    url_examples = []
-    for fname, items in emag_data["filters"].items():
-        for it in items:
-            url_examples.append(it["url_path"])
-
-    auto_patterns = """
-Acestea sunt toate pattern-urile reale extrase automat din HTML-ul eMAG:
-
-{}
-    
-Observații:
-- Orice filtru are structura: /label/<ceva>/<context>
-- Filtre multiple se unesc cu: /filter/A/B/C
-- Prețul are forma observată: pret,intre-<min>-si-<max>
-- Rating-ul are forma observată: rating,star-<min>
-""".format(
-        "\n".join(url_examples)
-    )
-
-    return f"""
-Ești un agent specializat în ACTUALIZAREA unui JSON de filtre pentru eMAG.ro.
-
-Ai acces la tot dump-ul brut de categorii și filtre extras din HTML:
-CATEGORII:
-{json.dumps(emag_data["categories"], indent=2, ensure_ascii=False)}
-
-FILTRE:
-{json.dumps(emag_data["filters"], indent=2, ensure_ascii=False)}
-
-PATTERN-URI DEDUSE AUTOMAT DIN HTML:
-{auto_patterns}
-
-REGULILE:
-1. Categoria NU se schimbă decât dacă utilizatorul cere explicit o altă categorie.
-   Exemple: cere schimbare de categorie:
-     - "nu mai vreau tricouri, vreau blugi"
-     - "caut pantaloni"
-     - "vreau haine pentru femei"
-   Dacă utilizatorul NU cere clar o categorie nouă, păstrezi categoria EXACT cum este în JSON-ul curent.
-   
-2. Filtrele se actualizează doar cu ce cere utilizatorul.
-
-3. Dacă utilizatorul spune clar că vrea ceva complet diferit
-   (ex: "schimb tot", "vreau altceva", "reset", "sterge tot", "de la zero"),
-   IGNORI JSON-ul curent și generezi unul NOU de la zero.
-
-4. Daca vreau in mesajul user ului folosesc "si" adauga la url ul curent , noua caracteristica
-
-5. PREȚUL trebuie interpretat cu formula:
-   /label/pret,intre-<min>-si-<max>/
-
-6. Rating:
-   /label/rating,star-<min>/
-
-7. TREBUIE SĂ RETURNZI STRICT JSON-ul:
-
-{{
-  "category": "<exact category name>",
-  "filters": [
-      {{
-         "filter_name": "Pret",
-         "min": 50,
-         "max": 200
-      }},
-      {{
-         "filter_name": "Culoare",
-         "option_label": "Negru"
-      }}
-  ]
-}}
-
-JSON-UL CURENT ESTE:
-{json.dumps(current_state, indent=2, ensure_ascii=False)}
-
-MESAJUL NOU AL UTILIZATORULUI ESTE:
-\"{user_message}\"
-
-NU returna text explicativ.
-NU returna alte câmpuri.
-"""
+    state = json.dumps(current_state, ensure_ascii=False, separators=(",", ":"))
+    return f'JSON-UL CURENT ESTE:\n{state}\n\nMESAJUL NOU AL UTILIZATORULUI ESTE:\n"{user_message}"'
 
 
 def ai_refine_filters(user_message, current_state):
     """
     Apelează LLM-ul pentru a rafina JSON-ul curent pe baza mesajului nou.
     """
-    emag_data = load_emag_data()
-    prompt = build_refine_prompt(user_message, current_state, emag_data)
+    def call():
+        response = generate("refine", build_refine_prompt(user_message, current_state))
+        return parse_model_json(response, "NU AM PUTUT PARSA JSON LA RAFINARE")
 
-    model = genai.GenerativeModel("gemini-2.5-flash-lite")
-    response = model.generate_content(prompt)
+    key = "refine|" + normalize_prompt(user_message, stem=FILTERS_CACHE_STEM) + "|" + canonical_state(current_state)
+    return cached_ai_call(key, call)
 
-    raw = response.candidates[0].content.parts[0].text.strip()
-    raw = raw.replace("```json", "").replace("```", "").strip()
 
-    try:
-        ai_output = json.loads(raw)
-    except Exception as e:
-        print("NU AM PUTUT PARSA JSON LA RAFINARE:\n", raw)
-        raise e
-
-    return ai_output
-
-
-def continue_conversation(user_message):
-    global conversation_state
+def continue_conversation(user_message, session_id=DEFAULT_SESSION):
+    conversation_state = sessions.get(session_id)
 
     if conversation_state is None:
-        _, ai_output = start_conversation(user_message)
+        _, ai_output = start_conversation(user_message, session_id)
         return ai_output
 
     old_category = conversation_state["category"]
@@ -282,16 +319,11 @@ def continue_conversation(user_message):
     #           → verificăm dacă există în JSON și abia atunci o schimbăm
     # -------------------------------------------------------------
     if explicit_change:
-        emag_categories = [
-            c["name"].lower()
-            for c in load_emag_data()["categories"]
-        ]
-
-        # Modelul a generat o nouă categorie?
-        if ai_output["category"].lower() in emag_categories:
+        # Modelul a generat o nouă categorie? (fără diacritice/majuscule)
+        if load_catalog().find_category(ai_output["category"]) is not None:
             ai_output["category"] = ai_output["category"]  # o păstrăm
         else:
             ai_output["category"] = old_category  # invalidă, revenim la vechea categorie
 
-    conversation_state = ai_output
+    sessions.set(session_id, ai_output)
     return ai_output
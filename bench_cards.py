@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for listing-card parsing (scraper.parse_card).
+
+Builds the card tree of the saved 60-card listing page once
+(fixtures/listing.html, see bench_parsing.py), then times only the card
+phase: card detection plus per-card extraction. It compares the original
+per-card selector chains with the per-page plan, so regressions in the
+card parser show up without tree-building noise.
+
+    python bench_cards.py [repeats]
+"""
+import re
+import sys
+import time
+
+import scraper
+from bench_parsing import load_fixture
+
+
+# =====================================================
+# ORIGINAL PER-CARD LOOP, FOR COMPARISON
+# =====================================================
+
+LEGACY_NAME_SELECTORS = [
+    "a.card-v2-title",
+    "h2.card-v2-title a",
+    "a[data-zone='title']",
+    "a.js-product-url",
+    "h2 a",
+    "a.product-title",
+    ".card-body a.card-v2-title",
+]
+
+LEGACY_PRICE_SELECTORS = [
+    ".product-new-price",
+    ".card-v2-price .product-new-price",
+    "p.product-new-price",
+    "span.product-new-price",
+    ".price-overview .product-new-price",
+]
+
+
+def legacy_cards(soup):
+    cards = []
+    cards.extend(soup.find_all("div", class_="card-item"))
+    cards.extend(soup.select("div.card-v2"))
+    cards.extend(soup.select("section.card-v2"))
+
+    unique_cards = []
+    seen_ids = set()
+    for c in cards:
+        if id(c) not in seen_ids:
+            seen_ids.add(id(c))
+            unique_cards.append(c)
+
+    products = []
+    for card in unique_cards:
+        name = None
+        for selector in LEGACY_NAME_SELECTORS:
+            elem = card.select_one(selector)
+            if elem and elem.get_text(strip=True):
+                name = elem.get_text(strip=True)
+                break
+
+        img_elem = card.select_one("img")
+        image = (img_elem.get("data-src") or img_elem.get("src")) if img_elem else None
+
+        price = None
+        for sel in LEGACY_PRICE_SELECTORS:
+            elem = card.select_one(sel)
+            if elem:
+                cleaned = re.sub(r"[^\d.,]", "", elem.get_text(strip=True))
+                cleaned = cleaned.replace(".", "").replace(",", ".")
+                match = re.search(r"\d+\.?\d*", cleaned)
+                if match:
+                    price = float(match.group())
+                    break
+
+        products.append((card.get("data-url"), name, image, price))
+    return products
+
+
+def planned_cards(soup):
+    cards = soup.find_all(['div', 'section'], recursive=False)
+    plan = scraper.detect_card_plan(cards)
+    return [scraper.parse_card(card, plan) for card in cards]
+
+
+def timed(fn, soup, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(soup)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    html, source = load_fixture('listing')
+    soup = scraper.make_soup(html, parse_only=scraper.CARD_STRAINER)
+    n_cards = len(planned_cards(soup))
+
+    legacy_ms = timed(legacy_cards, soup, repeats)
+    planned_ms = timed(planned_cards, soup, repeats)
+
+    print(f"Listing page: {source}, {n_cards} cards, {repeats} runs each")
+    print(f"  original selector chains : {legacy_ms:8.2f} ms/page  ({legacy_ms / max(n_cards, 1) * 1000:7.1f} us/card)")
+    print(f"  per-page card plan       : {planned_ms:8.2f} ms/page  ({planned_ms / max(n_cards, 1) * 1000:7.1f} us/card)")
+    print(f"  speedup                  : {legacy_ms / planned_ms:8.1f}x")
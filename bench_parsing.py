@@ -0,0 +1,157 @@
+"""
+Parse-time benchmark for the scrapers in scraper.py.
+
+Compares the original full-tree `BeautifulSoup(html, 'html.parser')`
+extraction with the current targeted parsers on saved HTML pages:
+
+    fixtures/listing.html   eMAG listing page (60 cards)
+    fixtures/product.html   eMAG product page
+    fixtures/vendor.html    eMAG vendor page
+    fixtures/company.html   listafirme.ro company page
+
+The committed fixtures are trimmed copies of real pages: the data
+markup (cards, vendor link and details, balance sheet) is kept as the
+sites serve it, navigation, scripts and reviews are cut down. Overwrite
+them with freshly saved pages (browser "Save page as → HTML only") when
+the sites' layout changes. A missing fixture is replaced with a
+synthetic page of similar size and structure.
+
+    python bench_parsing.py [repeats]
+"""
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+import scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PRODUCT_URL = 'https://www.emag.ro/produs/pd/D9J0TH3BM/'
+
+
+# =====================================================
+# SYNTHETIC FIXTURES
+# =====================================================
+
+def _noise(kb):
+    """Navigation / script markup that real pages carry around the data."""
+    block = (
+        '<div class="navbar-item"><a href="/cat/c">Categorie</a><span class="badge">nou</span></div>'
+        '<script>window.dataLayer = window.dataLayer || []; dataLayer.push({"event": "view"});</script>\n'
+    )
+    return block * (kb * 1024 // len(block))
+
+
+def _page(body, kb=300):
+    return f'<html><head><title>eMAG</title></head><body>{_noise(kb // 2)}{body}{_noise(kb // 2)}</body></html>'
+
+
+def synthetic_listing(cards=60):
+    items = ''.join(
+        f'<div class="card-item card-standard js-product-data" data-url="/produs-{i}/pd/X{i}/">'
+        f'<div class="card-v2-wrapper"><a class="card-v2-thumb" href="/produs-{i}/pd/X{i}/">'
+        f'<img src="//s13emagst.akamaized.net/products/{i}.jpg" alt="p"></a>'
+        f'<h2 class="card-v2-title-wrapper"><a class="card-v2-title" href="/produs-{i}/pd/X{i}/">Tricou barbati model {i}</a></h2>'
+        f'<div class="card-v2-price"><p class="product-new-price">{100 + i},99 <span>Lei</span></p></div>'
+        f'</div></div>'
+        for i in range(cards)
+    )
+    return _page(f'<div class="card-collection">{items}</div>')
+
+
+def synthetic_product():
+    return _page('<div class="product-page-vendor"><a href="/vendors/vendor/abc/v?ref=see_vendor_page&amp;x=1">Vandut de ABC</a></div>')
+
+
+def synthetic_vendor():
+    return _page(
+        '<div class="vendor-details">'
+        '<p><strong>Denumirea companiei:</strong> ABC FASHION S.R.L.</p>'
+        '<p><strong>Cod unic de inregistrare:</strong> 12345678</p>'
+        '</div>'
+    )
+
+
+def synthetic_company():
+    rows = ''.join(
+        f'<tr><td>{year}</td><td>1.200.000</td><td>150.000</td><td>80.000</td>'
+        f'<td>40.000</td><td>300.000</td><td>-</td><td>12</td></tr>'
+        for year in range(2024, 2009, -1)
+    )
+    other = '<table class="info"><tr><td>Adresa</td><td>Bucuresti</td></tr></table>' * 20
+    return _page(f'{other}<div id="bilant"><table><tbody>{rows}</tbody></table></div>{other}')
+
+
+SYNTHETIC = {
+    'listing': synthetic_listing,
+    'product': synthetic_product,
+    'vendor': synthetic_vendor,
+    'company': synthetic_company,
+}
+
+
+def load_fixture(name):
+    path = os.path.join(FIXTURES_DIR, f'{name}.html')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read(), 'saved'
+    return SYNTHETIC[name](), 'synthetic'
+
+
+# =====================================================
+# ORIGINAL (FULL-TREE) EXTRACTION, FOR COMPARISON
+# =====================================================
+
+def legacy_vendor_link(html, url):
+    soup = BeautifulSoup(html, 'html.parser')
+    return soup.select_one('a[href*="v?ref=see_vendor_page"]')
+
+
+def legacy_vendor_identity(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return (soup.find('strong', string="Denumirea companiei:"),
+            soup.find('strong', string="Cod unic de inregistrare:"))
+
+
+def legacy_financials(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    section = soup.find('div', id='bilant')
+    return section.find('table') if section else None
+
+
+def legacy_cards(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    return (soup.find_all("div", class_="card-item")
+            + soup.select("div.card-v2")
+            + soup.select("section.card-v2"))
+
+
+CASES = [
+    ('listing', 'parse_product_cards', legacy_cards, scraper.parse_product_cards),
+    ('product', 'parse_vendor_link', lambda h: legacy_vendor_link(h, PRODUCT_URL),
+     lambda h: scraper.parse_vendor_link(h, PRODUCT_URL)),
+    ('vendor', 'parse_vendor_identity', legacy_vendor_identity, scraper.parse_vendor_identity),
+    ('company', 'parse_financials', legacy_financials, scraper.parse_financials),
+]
+
+
+def timed(fn, html, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(html)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print(f"Tree builder: {scraper.HTML_PARSER}, {repeats} runs each\n")
+    print(f"{'page':<10}{'source':<11}{'KB':>6}  {'function':<24}{'legacy ms':>10}{'now ms':>9}{'speedup':>9}")
+
+    for name, label, legacy_fn, current_fn in CASES:
+        html, source = load_fixture(name)
+        legacy_ms = timed(legacy_fn, html, repeats)
+        current_ms = timed(current_fn, html, repeats)
+        print(f"{name:<10}{source:<11}{len(html) // 1024:>6}  {label:<24}"
+              f"{legacy_ms:>10.2f}{current_ms:>9.2f}{legacy_ms / current_ms:>8.1f}x")
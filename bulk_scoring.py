@@ -0,0 +1,146 @@
+import threading
+
+from company_store import company_store
+from scoring import SMALL_BUSINESS_LIMITS, has_financials, company_age, score_company
+
+# NumPy scores the whole vendor base with a handful of array operations;
+# without it every company goes through scoring.score_company (same
+# results, just slower).
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# =====================================================
+# BULK SCORING (whole vendor base at once)
+# =====================================================
+#
+# Powers the admin analytics endpoint: score histograms, "what if the
+# thresholds were ..." comparisons and top-K vendors, all computed from
+# the facts in company_store without touching the network.
+
+class CompanyTable:
+    """
+    Column arrays of every company with a balance sheet (`companies`
+    keeps the facts dicts in the same order). Companies without one are
+    never valid and are only counted.
+    """
+
+    def __init__(self, companies):
+        rows = [c for c in companies if has_financials(c)]
+        self.companies = rows
+        self.total = len(companies)
+        self.cui = [c['cui'] for c in rows]
+        self.name = [c['name'] for c in rows]
+        if np is not None:
+            self.turnover = np.array([c['turnover'] for c in rows], dtype=np.float64)
+            self.assets = np.array([c['assets'] for c in rows], dtype=np.float64)
+            self.employees = np.array([c['employees'] for c in rows], dtype=np.float64)
+            self.profit = np.array([c['profit'] for c in rows], dtype=np.float64)
+            self.debts = np.array([c['debts'] for c in rows], dtype=np.float64)
+            self.age = np.array([company_age(c) for c in rows], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.companies)
+
+    def score(self, limits=SMALL_BUSINESS_LIMITS):
+        """(valid, scores): one bool and one int per company; scores are 0 when not valid."""
+        if np is None:
+            verdicts = [score_company(c, limits) for c in self.companies]
+            return [v['is_valid'] for v in verdicts], [v['score'] for v in verdicts]
+
+        valid = ((self.turnover <= limits['max_turnover'])
+                 & (self.assets <= limits['max_assets'])
+                 & (self.employees < limits['max_employees']))
+
+        # scoring.compute_credibility, element-wise (same float operations)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = self.profit + np.abs(self.debts) ** 0.5
+            f = np.where(denom != 0, self.profit / denom, 0.0)
+            a = self.age / (self.age + 3)
+            scores = np.trunc((0.8 * f + 0.2 * a) * 100)
+        scores = np.where(np.isfinite(scores) & valid, scores, 0).astype(np.int64)
+        return valid, scores
+
+
+_table = None
+_table_version = None
+_table_lock = threading.Lock()
+
+
+def load_table(store=company_store):
+    """The CompanyTable for the store's current contents, rebuilt only when they change."""
+    global _table, _table_version
+    version = store.version()
+    with _table_lock:
+        if _table is None or _table_version != version:
+            _table = CompanyTable(store.all())
+            _table_version = version
+        return _table
+
+
+def histogram(valid, scores, bins=10):
+    """
+    Valid companies per score bucket: [{"from", "to", "count"}] over 0..100.
+    The formula can leave that range (negative profit); such scores are
+    counted in the first / last bucket.
+    """
+    width = 100 / bins
+    if np is not None:
+        picked = np.clip(np.asarray(scores)[np.asarray(valid, dtype=bool)], 0, 100)
+        counts = np.histogram(picked, bins=bins, range=(0, 100))[0].tolist()
+    else:
+        counts = [0] * bins
+        for ok, score in zip(valid, scores):
+            if ok:
+                counts[min(int(max(score, 0) // width), bins - 1)] += 1
+    return [
+        {'from': round(i * width, 2), 'to': round((i + 1) * width, 2), 'count': count}
+        for i, count in enumerate(counts)
+    ]
+
+
+def top_k(table, valid, scores, k=20):
+    """The k best valid companies, highest score first."""
+    if np is not None:
+        masked = np.where(valid, scores, -1)
+        k = min(k, int(np.count_nonzero(valid)))
+        order = np.argsort(-masked, kind='stable')[:k]
+    else:
+        order = sorted((i for i, ok in enumerate(valid) if ok), key=lambda i: -scores[i])[:k]
+    return [{'cui': table.cui[i], 'name': table.name[i], 'score': int(scores[i])} for i in order]
+
+
+def summary(table, valid, scores):
+    count = int(sum(valid)) if np is None else int(np.count_nonzero(valid))
+    if np is not None:
+        picked = scores[valid]
+        mean = float(picked.mean()) if count else 0.0
+    else:
+        picked = [s for ok, s in zip(valid, scores) if ok]
+        mean = sum(picked) / count if count else 0.0
+    return {'companies': table.total, 'withFinancials': len(table), 'valid': count, 'meanScore': round(mean, 2)}
+
+
+def what_if(table, limits, baseline=SMALL_BUSINESS_LIMITS, sample=20):
+    """
+    How the verdicts change if `limits` replaced `baseline`: counts of
+    companies that become valid / invalid, and the first few of each.
+    """
+    old_valid, _ = table.score(baseline)
+    new_valid, new_scores = table.score(limits)
+    if np is not None:
+        gained = np.flatnonzero(new_valid & ~old_valid)
+        lost = np.flatnonzero(old_valid & ~new_valid)
+    else:
+        gained = [i for i, (o, n) in enumerate(zip(old_valid, new_valid)) if n and not o]
+        lost = [i for i, (o, n) in enumerate(zip(old_valid, new_valid)) if o and not n]
+
+    return {
+        'limits': limits,
+        'becomeValid': len(gained),
+        'becomeInvalid': len(lost),
+        'newlyValid': [{'cui': table.cui[i], 'name': table.name[i], 'score': int(new_scores[i])} for i in gained[:sample]],
+        'newlyInvalid': [{'cui': table.cui[i], 'name': table.name[i]} for i in lost[:sample]],
+    }
@@ -0,0 +1,370 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# =====================================================
+# PERSISTENT TTL CACHE (shared by every request thread)
+# =====================================================
+
+class PersistentTTLCache:
+    """
+    Thread-safe key/value cache with per-entry expiry, persisted to a JSON file.
+
+    Writes are write-behind: `set` only marks the cache dirty and a daemon
+    thread flushes it to disk every `flush_interval` seconds (and once more
+    at interpreter exit). Expired entries are dropped on read and on flush.
+
+    `legacy` converts values from files written before entries carried a
+    timestamp; those entries are aged from the file's modification time.
+
+    With `max_entries` the cache is LRU-bounded: reads refresh an entry and
+    the least recently used one is evicted once the bound is exceeded.
+    `hits` / `misses` count lookups since start-up.
+    """
+
+    def __init__(self, path, ttl, flush_interval=5.0, legacy=None, max_entries=None):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._legacy = legacy
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._dirty = False
+        self._flusher = None
+        self._stop = threading.Event()
+        self._load()
+
+    # ---------- persistence ----------
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            file_ts = os.path.getmtime(self.path)
+        except Exception as e:
+            print(f"[CACHE] Could not read {self.path}: {e}")
+            return
+
+        now = time.time()
+        loaded = []
+        for key, entry in data.items():
+            if isinstance(entry, dict) and 'ts' in entry and 'value' in entry:
+                value, ts = entry['value'], entry['ts']
+            elif self._legacy is not None:
+                try:
+                    value, ts = self._legacy(entry), file_ts
+                except Exception:
+                    continue
+            else:
+                continue
+            if now - ts < self.ttl:
+                loaded.append((ts, key, value))
+
+        # Oldest first, so the LRU bound drops the stalest entries
+        for ts, key, value in sorted(loaded, key=lambda e: e[0]):
+            self._entries[key] = (value, ts)
+        self._evict()
+
+        print(f"[CACHE] Loaded {len(self._entries)} entries from {self.path}.")
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            snapshot = {
+                key: {'value': value, 'ts': ts}
+                for key, (value, ts) in self._entries.items()
+                if now - ts < self.ttl
+            }
+            self._dirty = False
+
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[CACHE] Error saving {self.path}: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _ensure_flusher(self):
+        # Started lazily so importing the module never spawns threads
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    # ---------- dict-like access ----------
+
+    def _evict(self):
+        if self.max_entries is None:
+            return
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._dirty = True
+
+    def get_with_age(self, key):
+        """(value, age in seconds), or (None, None) when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            value, ts = entry
+            age = time.time() - ts
+            if age >= self.ttl:
+                del self._entries[key]
+                self._dirty = True
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, age
+
+    def get(self, key, default=None):
+        value, _ = self.get_with_age(key)
+        return default if value is None else value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty = True
+            self._ensure_flusher()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# =====================================================
+# SQLITE BACKEND (shared by every worker process)
+# =====================================================
+
+def open_sqlite(path):
+    """Connection tuned for many readers and short writes from several processes."""
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteConnections:
+    """One connection per thread and per process: a connection must not cross fork()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            self._local.pid = os.getpid()
+            conn = self._local.conn = open_sqlite(self.path)
+        return conn
+
+
+class SQLiteTTLCache:
+    """
+    Same interface as PersistentTTLCache, stored in one table of a SQLite
+    database so gunicorn workers share entries instead of each keeping (and
+    overwriting) its own JSON file. Writes go straight to the database, so
+    `flush` / `close` have nothing to do.
+
+    On first use the table is seeded from the cache's JSON file, if any.
+    `hits` / `misses` are per process.
+    """
+
+    def __init__(self, db_path, table, ttl, max_entries=None, import_from=None, legacy=None):
+        self.db_path = db_path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._connections = SQLiteConnections(db_path)
+
+        conn = open_sqlite(db_path)
+        with conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " ts REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table}(last_used)")
+            empty = conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is None
+        conn.close()
+
+        if empty and import_from and os.path.exists(import_from):
+            self._import(PersistentTTLCache(import_from, ttl, legacy=legacy))
+
+    def _conn(self):
+        return self._connections.get()
+
+    def _import(self, source):
+        rows = [
+            (key, json.dumps(value, ensure_ascii=False), ts, ts)
+            for key, (value, ts) in source._entries.items()
+        ]
+        with self._conn() as conn:
+            conn.executemany(f"INSERT OR IGNORE INTO {self.table} VALUES (?, ?, ?, ?)", rows)
+        print(f"[CACHE] Imported {len(rows)} entries from {source.path} into {self.db_path}:{self.table}.")
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_with_age(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            f"SELECT value, ts FROM {self.table} WHERE key = ? AND ts > ?",
+            (key, now - self.ttl),
+        ).fetchone()
+        if row is None:
+            self._count(False)
+            return None, None
+        if self.max_entries is not None:
+            with conn:
+                conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return json.loads(row[0]), now - row[1]
+
+    def get(self, key, default=None):
+        value, _ = self.get_with_age(key)
+        return default if value is None else value
+
+    def set(self, key, value):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            conn.execute(f"DELETE FROM {self.table} WHERE ts <= ?", (now - self.ttl,))
+            if self.max_entries is not None:
+                conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f" SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        row = self._conn().execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE ts > ?", (time.time() - self.ttl,)
+        ).fetchone()
+        return row[0]
+
+
+# =====================================================
+# SHARED INSTANCES
+# =====================================================
+
+# json (default): one JSON file per cache, fine for a single process.
+# sqlite: one database (CACHE_DB) shared by every worker process.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'json').lower()
+CACHE_DB = os.getenv('CACHE_DB', 'cache.db')
+
+
+def make_cache(table, path, ttl, legacy=None, max_entries=None):
+    if CACHE_BACKEND == 'sqlite':
+        return SQLiteTTLCache(CACHE_DB, table, ttl, max_entries=max_entries,
+                              import_from=path, legacy=legacy)
+    return PersistentTTLCache(path, ttl, legacy=legacy, max_entries=max_entries)
+
+
+def product_key(url):
+    """Product URLs differ only by tracking query strings across listings."""
+    return url.split('#')[0].split('?')[0]
+
+
+# Company facts (and verdicts computed from them) live in company_store
+
+PRODUCT_CACHE_FILE = 'products_cache.json'
+PRODUCT_CACHE_TTL = int(os.getenv('PRODUCT_CACHE_TTL', 3 * 24 * 3600))
+
+# product URL -> {'vendor_page': str, 'name': str, 'cui': str}
+product_cache = make_cache('products', PRODUCT_CACHE_FILE, ttl=PRODUCT_CACHE_TTL)
+
+FILTERS_CACHE_FILE = 'filters_cache.json'
+FILTERS_CACHE_TTL = int(os.getenv('FILTERS_CACHE_TTL', 24 * 3600))
+FILTERS_CACHE_SIZE = int(os.getenv('FILTERS_CACHE_SIZE', 5000))
+
+# normalized prompt (+ canonical state for refinements) -> {'category', 'filters'}
+filters_cache = make_cache(
+    'filters',
+    FILTERS_CACHE_FILE,
+    ttl=FILTERS_CACHE_TTL,
+    max_entries=FILTERS_CACHE_SIZE,
+)
+
+RESULTS_CACHE_FILE = 'results_cache.json'
+RESULTS_CACHE_FRESH = int(os.getenv('RESULTS_CACHE_FRESH', 10 * 60))
+RESULTS_CACHE_STALE = int(os.getenv('RESULTS_CACHE_STALE', 50 * 60))
+RESULTS_CACHE_SIZE = int(os.getenv('RESULTS_CACHE_SIZE', 200))
+
+# canonical search URL -> validated products, sorted by credibility score.
+# Entries are fresh for RESULTS_CACHE_FRESH seconds, then served stale (and
+# refreshed in the background) for another RESULTS_CACHE_STALE seconds.
+results_cache = make_cache(
+    'results',
+    RESULTS_CACHE_FILE,
+    ttl=RESULTS_CACHE_FRESH + RESULTS_CACHE_STALE,
+    max_entries=RESULTS_CACHE_SIZE,
+)
@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+
+
+CATALOG_FILE = "emag_filters_and_categories.json"
+
+
+# =====================================================
+# KEY NORMALIZATION
+# =====================================================
+
+def fold(text):
+    """
+    Case-, diacritic- and whitespace-insensitive lookup key:
+    "Cămăși " -> "camasi", "Preț" -> "pret".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", stripped).strip().lower()
+
+
+# Romanian inflection endings, longest first (tricourile, galbene, rosii, ...)
+STEM_SUFFIXES = ("urile", "urilor", "ilor", "uri", "ele", "ile", "ul", "ua", "le",
+                 "ii", "a", "e", "i", "u")
+_WORD_RE = re.compile(r"[a-z0-9&']+")
+
+
+def stem_word(word):
+    """
+    Light Romanian stemmer for cache keys: "tricouri"/"tricou" -> "trico",
+    "galbene"/"galben" -> "galben", "neagra"/"negru" -> "negr".
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    word = word.replace("ea", "e").replace("oa", "o")
+    stripped = True
+    while stripped:  # "pijamale" -> "pijama" -> "pijam"
+        stripped = False
+        for suffix in STEM_SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)]
+                stripped = True
+                break
+    return word
+
+
+def normalize_prompt(text, stem=True):
+    """
+    Cache key for a free-text prompt: folded, punctuation dropped, whitespace
+    collapsed and (optionally) stemmed, so "Tricou  galben " and
+    "tricouri galbene" share one entry.
+    """
+    words = _WORD_RE.findall(fold(text))
+    if stem:
+        words = [stem_word(w) for w in words]
+    return " ".join(words)
+
+
+def filter_slug(url_path):
+    """'/label/filter/culoare-f9700,galben-v30367/ctx' -> 'culoare-f9700,galben-v30367'"""
+    return url_path.split("/filter/")[-1].split("/")[0]
+
+
+def category_url_parts(url):
+    """
+    (label, context, end) of a category URL, e.g.
+    https://www.emag.ro/label/blugi-barbati/imbracaminte-el-vh/c?ref=...
+    -> ("label/blugi-barbati", "imbracaminte-el-vh", "c")
+    """
+    path = url.split("https://www.emag.ro")[-1].split("?")[0]
+    parts = path.strip("/").split("/")
+    if len(parts) < 4:
+        return None
+    return "/".join(parts[:2]), parts[2], parts[3]
+
+
+# =====================================================
+# READ-ONLY CATALOG VIEW
+# =====================================================
+
+class FrozenDict(dict):
+    """dict that refuses mutation; still a dict for json.dumps and lookups."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("catalog data is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class Catalog:
+    """
+    The eMAG categories/filters dump, loaded once and shared by every caller.
+
+    `data` has the same shape as the JSON file (read-only). The lookup
+    tables below replace the list scans callers used to do per request.
+    """
+
+    def __init__(self, raw):
+        self.data = freeze(raw)
+        self.categories = self.data["categories"]
+        self.filters = self.data["filters"]
+
+        # lowercased category name -> category
+        self.categories_by_name = FrozenDict(
+            (c["name"].lower(), c) for c in self.categories
+        )
+        self.category_names = frozenset(self.categories_by_name)
+
+        # filter name -> lowercased option label -> option
+        self.filter_options = FrozenDict(
+            (fname, FrozenDict((it["label"].lower(), it) for it in items))
+            for fname, items in self.filters.items()
+        )
+
+        # Compiled URL-building index, keyed by folded names so that
+        # "Cămăși" and "camasi" hit the same entry:
+        #   folded category name -> (category, (label, context, end) or None)
+        #   (folded filter name, folded option label) -> URL slug
+        self.category_index = FrozenDict(
+            (fold(c["name"]), (c, category_url_parts(c["url"])))
+            for c in self.categories
+        )
+        self.option_slugs = FrozenDict(
+            ((fold(fname), fold(it["label"])), filter_slug(it["url_path"]))
+            for fname, items in self.filters.items()
+            for it in items
+        )
+
+    def find_category(self, name):
+        entry = self.category_index.get(fold(name))
+        return entry[0] if entry else None
+
+    def option_slug(self, filter_name, option_label):
+        return self.option_slugs.get((fold(filter_name), fold(option_label)))
+
+
+# =====================================================
+# LOADING (reloaded only when the file changes)
+# =====================================================
+
+_lock = threading.Lock()
+_cached = None
+_cached_stamp = None
+
+
+def _file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_catalog(path=CATALOG_FILE):
+    global _cached, _cached_stamp
+
+    stamp = _file_stamp(path)
+    if _cached is not None and _cached_stamp == (path, stamp):
+        return _cached
+
+    with _lock:
+        if _cached is None or _cached_stamp != (path, stamp):
+            with open(path, "r", encoding="utf-8") as f:
+                _cached = Catalog(json.load(f))
+            _cached_stamp = (path, stamp)
+        return _cached
+
+
+def load_emag_data():
+    """Catalog as the raw {"categories": [...], "filters": {...}} structure."""
+    return load_catalog().data
+
+
+def catalog_for(emag_data=None):
+    """
+    The indexed Catalog for `emag_data`: the shared one when it is (or
+    wraps) the catalog file, otherwise a one-off index over the given dict.
+    """
+    catalog = load_catalog()
+    if emag_data is None or emag_data is catalog.data:
+        return catalog
+    return Catalog(emag_data)
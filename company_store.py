@@ -0,0 +1,98 @@
+import os
+import time
+
+from cache_store import open_sqlite, SQLiteConnections
+
+
+# =====================================================
+# COMPANY FACTS (SQLite, keyed by CUI)
+# =====================================================
+
+COMPANY_DB = os.getenv('COMPANY_DB', 'companies.db')
+
+# Balance sheets are published once a year; re-fetch facts older than this
+COMPANY_FACTS_TTL = int(os.getenv('COMPANY_FACTS_TTL', 30 * 24 * 3600))
+
+FACT_FIELDS = ('turnover', 'profit', 'debts', 'assets', 'employees', 'founded')
+COLUMNS = ('cui', 'name') + FACT_FIELDS + ('fetched',)
+
+
+class CompanyStore:
+    """
+    What listafirme.ro says about each vendor company: the latest balance
+    sheet figures, the year of its first one and when we fetched them.
+    Companies without a balance sheet are stored too (fact fields NULL),
+    so they aren't fetched again until the facts expire.
+
+    Verdicts are not stored: scoring.score_company computes them from the
+    facts, so a new threshold or formula needs no re-scrape.
+    """
+
+    def __init__(self, db_path=COMPANY_DB, ttl=COMPANY_FACTS_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._connections = SQLiteConnections(db_path)
+
+        conn = open_sqlite(db_path)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS companies ("
+                " cui TEXT PRIMARY KEY, name TEXT NOT NULL,"
+                " turnover INTEGER, profit INTEGER, debts INTEGER, assets INTEGER,"
+                " employees INTEGER, founded INTEGER,"
+                " fetched REAL NOT NULL)"
+            )
+        conn.close()
+
+    def _conn(self):
+        return self._connections.get()
+
+    def get(self, cui):
+        """Facts fetched less than `ttl` seconds ago, or None."""
+        row = self._conn().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM companies WHERE cui = ? AND fetched >= ?",
+            (str(cui), time.time() - self.ttl),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(zip(COLUMNS, row))
+
+    def put(self, cui, name, facts):
+        """
+        Stores parsed facts (scraper.parse_company_facts, or None when the
+        page had no balance sheet) and returns the stored record.
+        """
+        record = dict({field: None for field in FACT_FIELDS}, **(facts or {}))
+        record.update(cui=str(cui), name=name, fetched=time.time())
+        with self._conn() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO companies ({', '.join(COLUMNS)})"
+                f" VALUES ({', '.join('?' * len(COLUMNS))})",
+                [record[c] for c in COLUMNS],
+            )
+        return record
+
+    def all(self):
+        """Every stored company, expired or not (for re-scoring)."""
+        rows = self._conn().execute(f"SELECT {', '.join(COLUMNS)} FROM companies").fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def version(self):
+        """Changes whenever a company is added or re-fetched (cheap, for derived caches)."""
+        return self._conn().execute("SELECT COUNT(*), MAX(fetched) FROM companies").fetchone()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': self._conn().execute("SELECT COUNT(*) FROM companies").fetchone()[0],
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+company_store = CompanyStore()
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+import resilience
+from http_cache import http_cache
+
+# aiohttp is the preferred transport; without it every fetch runs through
+# the pooled `http_client` session in the loop's default executor
+# (bounded by the host limits).
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# =====================================================
+# ASYNC FETCH ENGINE
+# =====================================================
+
+class AsyncFetcher:
+    """
+    One event loop (running in a daemon thread) and one connection pool
+    shared by every scraping stage: listing pages, vendor pages and
+    listafirme.ro balance sheets.
+
+    eMAG and listafirme.ro fetches go through their rate_limit limiter
+    (token bucket + AIMD concurrency, never above http_client.HOST_POOLS);
+    other hosts get a plain semaphore of their pool size. Hundreds of
+    product coroutines can be scheduled at once without opening hundreds
+    of connections. Blocking callers (Flask views, the CLI) hand
+    coroutines over with `run`.
+    """
+
+    def __init__(self, total=64, timeout=http_client.DEFAULT_TIMEOUT):
+        self.total = total
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._session = None
+        self._sync_session = None
+        self._host_limits = {}
+
+    # ---------- event loop ----------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return self._loop
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+            self._thread.start()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Runs `coro` on the engine loop and blocks until it finishes."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def iterate(self, agen):
+        """
+        Blocking iterator over an async generator running on the engine
+        loop, for callers that stream results (e.g. Flask responses).
+        """
+        loop = self._ensure_loop()
+        items = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            finally:
+                items.put(done)
+
+        fut = asyncio.run_coroutine_threadsafe(pump(), loop)
+        try:
+            while True:
+                item = items.get()
+                if item is done:
+                    break
+                yield item
+            fut.result()
+        finally:
+            # Client went away: stop the remaining fetches
+            fut.cancel()
+
+    # ---------- fetching ----------
+
+    def _host_limit(self, host):
+        sem = self._host_limits.get(host)
+        if sem is None:
+            # Never run more fetches than the host's keep-alive pool holds
+            sem = asyncio.Semaphore(http_client.host_pool_size(host))
+            self._host_limits[host] = sem
+        return sem
+
+    def _get_session(self):
+        if self._session is None:
+            # Per-host bounds come from the semaphores above
+            connector = aiohttp.TCPConnector(limit=self.total, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+            )
+        return self._session
+
+    def _sync_get(self, url, headers):
+        # The engine paces requests itself, so this session doesn't
+        if self._sync_session is None:
+            self._sync_session = http_client.build_session(rate_limited=False)
+        r = self._sync_session.get(url, headers=headers, timeout=self.timeout)
+        return r.status_code, r.text, CaseInsensitiveDict(r.headers)
+
+    async def _get(self, url, headers):
+        """(status, text, response headers); network errors give (None, None, None)."""
+        try:
+            if aiohttp is not None:
+                async with self._get_session().get(http_client.rewrite_url(url), headers=headers) as r:
+                    return r.status, await r.text(), CaseInsensitiveDict(r.headers)
+            return await asyncio.to_thread(self._sync_get, url, headers)
+        except Exception as e:
+            print(f"Fetch error for {url}: {e}")
+            return None, None, None
+
+    async def _fetch_once(self, host, url, headers):
+        limiter = http_client.limiter_for(host)
+        if limiter is None:
+            async with self._host_limit(host):
+                return await self._get(url, headers)
+
+        async with limiter.slot():
+            start = time.monotonic()
+            status, text, resp_headers = await self._get(url, headers)
+            retry_after = resp_headers.get('Retry-After') if resp_headers is not None else None
+            limiter.record(status, time.monotonic() - start, retry_after)
+        return status, text, resp_headers
+
+    async def fetch(self, url, headers=None, cacheable=None):
+        """
+        Returns (status, text). Pages in the HTTP cache (http_cache) are
+        served from disk while fresh and revalidated with a conditional GET
+        once stale. A 200 is stored unless `cacheable(text)` says otherwise
+        (e.g. a block page served with a 200). Transient failures (network errors, 429, 5xx) are
+        retried with backoff; if they persist, or the host's circuit
+        breaker is open, the status is None or the last 5xx/429. Use
+        resilience.is_transient_status to tell those apart from real
+        answers like 404.
+        """
+        # SQLite reads/writes and zlib run in worker threads, off the loop
+        page = await asyncio.to_thread(http_cache.lookup, url) if http_cache is not None else None
+        if page is not None:
+            if page.is_fresh():
+                return 200, page.body
+            headers = dict(headers or {}, **page.conditional_headers())
+
+        host = urlparse(url).netloc
+        status, text, resp_headers = await resilience.fetch_with_retry(
+            lambda: self._fetch_once(host, url, headers), resilience.breaker_for(host)
+        )
+
+        if status == 304 and page is not None:
+            return 200, await asyncio.to_thread(http_cache.revalidated_page, page, resp_headers)
+        if status == 200 and http_cache is not None and (cacheable is None or cacheable(text)):
+            await asyncio.to_thread(http_cache.store, url, text, resp_headers)
+        return status, text
+
+    async def forget(self, url):
+        """Drops the cached copy of `url` (e.g. a page the caller rejected)."""
+        if http_cache is not None:
+            await asyncio.to_thread(http_cache.delete, url)
+
+    async def get_text(self, url, headers=None):
+        """Body of a 2xx response, otherwise None."""
+        status, text = await self.fetch(url, headers=headers)
+        if status is None or status >= 400:
+            return None
+        return text
+
+
+# Shared engine used by the API and the CLI scripts
+engine = AsyncFetcher(total=int(os.getenv('SCRAPER_MAX_CONNECTIONS', 64)))
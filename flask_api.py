@@ -1,15 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Blueprint, current_app, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
-import re
-import time
 import json
+import math
 import os
-from datetime import datetime
+import time
+import uuid
 import stripe
 
 # ===== Import AI conversation system =====
@@ -17,501 +12,421 @@ from agent import (
     start_conversation,
     continue_conversation,
     reset_conversation,
+    get_conversation_state,
     load_emag_data
 )
 
 from url_builder import build_emag_url_from_ai
 
+from fetch_engine import engine
+from pipeline import VendorPipeline, iter_listing
+from cache_store import filters_cache, product_cache, results_cache
+from company_store import company_store
+import bulk_scoring
+from scoring import SMALL_BUSINESS_LIMITS
+from http_cache import http_cache
+from history_store import search_history
+from jobs import search_jobs, QueueFull
+import rate_limit
+import resilience
+from resilience import TransientError
+from search_service import (
+    to_product_json,
+    sort_products,
+    store_results,
+    cached_results
+)
+
 
 # =====================================================
 # FLASK APP INIT
 # =====================================================
 
-app = Flask(__name__)
-CORS(app)
+# Routes live on a blueprint; create_app() builds the WSGI app
+# (dev server below, gunicorn/waitress through wsgi.py)
+api = Blueprint('api', __name__)
 
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY', 'sk_test_51SbXPE0K3XOps5QbrJJGSdqs8c8FMaE1sv69Dv6F0JxMNdfoXVyGDhPdjHy5sbXK1RfnmmaTQow3cjcUUxci4CON00IhmoaKv1')
 
 
 # =====================================================
-# GLOBAL CONVERSATION STATE
+# CONVERSATION SESSIONS
 # =====================================================
 
-conversation_state = None
+def request_session_id(data):
+    """
+    Client session ID from the X-Session-ID header or the "sessionId" body
+    field. Requests without one get a fresh ID, returned as "sessionId" so
+    the client can continue the conversation.
+    """
+    sid = request.headers.get('X-Session-ID') or (data or {}).get('sessionId')
+    sid = str(sid).strip()[:128] if sid else ''
+    return sid or uuid.uuid4().hex
 
 
 # =====================================================
 # SEARCH HISTORY UTILS
 # =====================================================
 
-SEARCH_HISTORY_FILE = 'search_history.json'
+# One row per search in SQLite (history_store); the old JSON file is
+# imported on first start.
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
 
-def load_search_history():
-    if os.path.exists(SEARCH_HISTORY_FILE):
-        try:
-            with open(SEARCH_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
 
-def save_search_history(history):
+def add_to_search_history(prompt, products, search_url=None):
     try:
-        with open(SEARCH_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        return search_history.add(prompt, products, search_url)
     except Exception as e:
         print(f"Error saving search history: {e}")
 
-def add_to_search_history(prompt, product_count):
-    history = load_search_history()
-    history.append({
-        'id': len(history),
-        'prompt': prompt,
-        'productCount': product_count,
-        'timestamp': datetime.now().isoformat()
-    })
-    if len(history) > 50:
-        history = history[-50:]
-    save_search_history(history)
-
 
 
 # ===================================================================
-# SCRAPING + COMPANY VALIDATION CODE (UNCHANGED FROM YOUR VERSION)
+# MAIN API ENDPOINT — FIXED TO USE AI CONVERSATION
 # ===================================================================
 
-def get_product_list(base_url, max_pages=2):
-    """
-    Extracts product URL, name, image and price from eMAG listing pages.
-    Robust version compatible with NEW (2024–2025) layout.
-    """
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-    }
-
-    all_products = []
+RESET_COMMANDS = ["reset", "sterge", "șterge", "reset conversatie", "sterge tot"]
 
-    for page in range(1, max_pages + 1):
-
-        # Build paginated URL
-        if page == 1:
-            target_url = base_url
-        else:
-            if base_url.endswith('/c'):
-                target_url = base_url[:-2] + f'/p{page}/c'
-            else:
-                target_url = f"{base_url}/p{page}/c"
 
-        print("Scraping:", target_url)
-
-        try:
-            response = requests.get(target_url, headers=headers)
-            if response.status_code == 404:
-                break
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # =====================================================
-            # UNIVERSAL DETECTION OF PRODUCT CARDS
-            # =====================================================
-            cards = []
+def resolve_search(prompt, session_id):
+    """
+    Runs one conversation step for `prompt` in the given session and
+    builds the eMAG URL. Returns (ai_output, search_url).
+    """
+    # FIRST MESSAGE
+    if get_conversation_state(session_id) is None:
+        warm_msg, ai_output = start_conversation(prompt, session_id)
+        print("AI:", warm_msg)
+    else:
+        # FOLLOW-UP MESSAGE
+        ai_output = continue_conversation(prompt, session_id)
+        print("AI: Filtre actualizate")
 
-            # Old layout
-            cards.extend(soup.find_all("div", class_="card-item"))
+    # Build eMAG URL
+    search_url = build_emag_url_from_ai(ai_output, load_emag_data())
+    print("Generated URL:", search_url)
 
-            # New layout (2024–2025)
-            cards.extend(soup.select("div.card-v2"))
+    return ai_output, search_url
 
-            # Another variation seen in A/B tests
-            cards.extend(soup.select("section.card-v2"))
 
-            # Remove duplicate tags
-            unique_cards = []
-            seen_ids = set()
-            for c in cards:
-                if id(c) not in seen_ids:
-                    seen_ids.add(id(c))
-                    unique_cards.append(c)
+def run_search_job(job, prompt, session_id):
+    """
+    One /api/search job on the worker pool. Progress in the job state:
+      stage "filters"   LLM / local parser, then "url" and "filters" are set
+      stage "scraping"  pagesScraped, vendorsChecked / vendorsTotal and the
+                        validated "products" found so far (unsorted)
+    Returns the final fields, the same as the old synchronous response.
+    """
+    job.update(stage='filters')
+    ai_output, search_url = resolve_search(prompt, session_id)
+    job.update(url=search_url, filters=ai_output)
+
+    cached = cached_results(search_url)
+    if cached is not None:
+        add_to_search_history(prompt, cached, search_url)
+        return {"success": True, "products": cached, "count": len(cached), "cached": True}
+
+    job.update(stage='scraping', pagesScraped=0, vendorsChecked=0, vendorsTotal=0, products=[])
+    seen = set()
+    pages = []
+
+    async def tracked_pages():
+        # Runs on the fetch engine's loop: only count here, the job thread
+        # reports the progress (and does the store writes)
+        async for batch in iter_listing(engine, search_url):
+            seen.update(p['url'] for p in batch)
+            pages.append(len(batch))
+            yield batch
+
+    valid = []
+    pipeline = VendorPipeline(engine)
+    for res in engine.iterate(pipeline.process_stream(tracked_pages())):
+        if res and res[2]:
+            valid.append(to_product_json(res))
+        job.update(pagesScraped=len(pages), vendorsTotal=len(seen),
+                   vendorsChecked=job.state['vendorsChecked'] + 1, products=valid)
+
+    sort_products(valid)
+    store_results(search_url, valid)
+    add_to_search_history(prompt, valid, search_url)
+    return {"success": True, "products": valid, "count": len(valid), "cached": False}
+
+
+@api.route('/api/search', methods=['POST'])
+def search_products():
+    """
+    Queues the search and answers 202 right away with {"jobId", "statusUrl"}.
+    Poll GET /api/search/jobs/<jobId> for progress and the final products.
+    """
+    try:
+        data = request.get_json()
+        prompt = data.get('prompt', '').strip()
+        session_id = request_session_id(data)
 
-            cards = unique_cards
+        if not prompt:
+            return jsonify({'error': 'Prompt is required'}), 400
 
-            # =====================================================
-            # PARSE EACH PRODUCT CARD
-            # =====================================================
-            for card in cards:
-                product = {}
+        print("User prompt:", prompt)
 
-                # ==========================================
-                # PRODUCT URL
-                # ==========================================
-                url = card.get("data-url")
+        # RESET conversation
+        if prompt.lower() in RESET_COMMANDS:
+            reset_conversation(session_id)
+            return jsonify({"success": True, "message": "Context resetat.", "sessionId": session_id})
 
-                if not url:
-                    a_tag = card.find("a", href=True)
-                    if a_tag:
-                        url = a_tag["href"]
+        job = search_jobs.submit(run_search_job, prompt, session_id, prompt=prompt, sessionId=session_id)
 
-                if not url:
-                    continue
+        return jsonify({
+            "success": True,
+            "jobId": job['id'],
+            "status": job['status'],
+            "statusUrl": f"/api/search/jobs/{job['id']}",
+            "sessionId": session_id
+        }), 202
+
+    except QueueFull as e:
+        return jsonify({'error': f'Server busy, try again shortly ({e})'}), 503
+    except Exception as e:
+        print("ERROR:", e)
+        return jsonify({'error': str(e)}), 500
 
-                if url.startswith("/"):
-                    url = "https://www.emag.ro" + url
-                elif not url.startswith("http"):
-                    url = "https://www.emag.ro/" + url
-
-                product["url"] = url
-
-                # ==========================================
-                # PRODUCT NAME (UNIVERSAL SCRAPER)
-                # ==========================================
-                name = None
-                name_selectors = [
-                    "a.card-v2-title",
-                    "h2.card-v2-title a",
-                    "a[data-zone='title']",
-                    "a.js-product-url",
-                    "h2 a",
-                    "a.product-title",
-                    ".card-body a.card-v2-title",
-                ]
-
-                for selector in name_selectors:
-                    elem = card.select_one(selector)
-                    if elem:
-                        txt = elem.get_text(strip=True)
-                        if txt:
-                            name = txt
-                            break
-
-                # Fallback: any <a> with meaningful text
-                if not name:
-                    for a in card.find_all("a"):
-                        txt = a.get_text(strip=True)
-                        if txt and len(txt) > 4:
-                            name = txt
-                            break
-
-                product["name"] = name or "Unknown Product"
-
-                # ==========================================
-                # PRODUCT IMAGE (UNIVERSAL SCRAPER)
-                # ==========================================
-                img_elem = card.select_one("img")
-                img_src = None
-
-                if img_elem:
-                    img_src = img_elem.get("data-src") or img_elem.get("src")
-
-                if img_src:
-                    if img_src.startswith("//"):
-                        img_src = "https:" + img_src
-                    elif img_src.startswith("/"):
-                        img_src = "https://www.emag.ro" + img_src
-
-                product["image"] = img_src
-
-                # ==========================================
-                # PRODUCT PRICE (UNIVERSAL SCRAPER)
-                # ==========================================
-                price_selectors = [
-                    ".product-new-price",
-                    ".card-v2-price .product-new-price",
-                    "p.product-new-price",
-                    "span.product-new-price",
-                    ".price-overview .product-new-price",
-                ]
-
-                price_val = None
-
-                for sel in price_selectors:
-                    elem = card.select_one(sel)
-                    if elem:
-                        txt = elem.get_text(strip=True)
-                        cleaned = re.sub(r"[^\d.,]", "", txt)
-                        cleaned = cleaned.replace(".", "").replace(",", ".")
-                        match = re.search(r"\d+\.?\d*", cleaned)
-
-                        if match:
-                            try:
-                                price_val = float(match.group())
-                                break
-                            except:
-                                pass
-
-                product["price"] = price_val
-
-                # DONE — append card
-                all_products.append(product)
-
-            # Slow scraping avoidance
-            time.sleep(0.2)
 
-        except Exception as e:
-            print("Scraping error:", e)
-            continue
+@api.route('/api/search/jobs/<job_id>', methods=['GET'])
+def search_job_status(job_id):
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
 
-    return all_products
 
+def ndjson(event):
+    return json.dumps(event, ensure_ascii=False) + "\n"
 
 
-def extr_vendor_page(url, session):
-    try:
-        response = session.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        v = soup.select_one('a[href*="v?ref=see_vendor_page"]')
-        if not v:
-            return None
-        return urljoin(url, v.get('href'))
-    except:
-        return None
+@api.route('/api/search/stream', methods=['POST'])
+def search_products_stream():
+    """
+    Streaming variant of /api/search for clients that keep the connection
+    open (the frontend). The body is NDJSON, one event per line:
 
+      {"type": "filters", "url": ..., "filters": ..., "sessionId": ...}
+      {"type": "product", "product": {...}}     once per validated vendor
+      {"type": "done", "success": true, "products": [...], "count": N, ...}
 
-def extr_vendor_name(url, session):
+    The final "done" event carries the same fields as a finished search
+    job, with products sorted by credibility score. Cached searches skip straight to
+    "done".
+    """
     try:
-        r = session.get(url)
-        soup = BeautifulSoup(r.text, 'html.parser')
-        n = soup.find('strong', string="Denumirea companiei:")
-        c = soup.find('strong', string="Cod unic de inregistrare:")
-        if n and c:
-            return n.next_sibling.strip(), c.next_sibling.strip()
-    except:
-        return None, None
-    return None, None
-
-
-def create_company_site_url(name, code):
-    slug = re.sub(r'[^a-z0-9]+', '-', name.lower().strip()) + f"-{code}"
-    return f"https://listafirme.ro/{slug}/"
-
-
-def clean_num(t):
-    return re.sub(r'\D', '', t)
+        data = request.get_json()
+        prompt = data.get('prompt', '').strip()
+        session_id = request_session_id(data)
 
+        if not prompt:
+            return jsonify({'error': 'Prompt is required'}), 400
 
-def get_latest_financials(url, session):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+        print("User prompt:", prompt)
 
-    try:
-        response = session.get(url, headers=headers)
-        response.raise_for_status()
+        if prompt.lower() in RESET_COMMANDS:
+            reset_conversation(session_id)
+            return jsonify({"success": True, "message": "Context resetat.", "sessionId": session_id})
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+        ai_output, search_url = resolve_search(prompt, session_id)
 
-        # 1. Find the specific container for the balance sheet ("bilanț")
-        bilant_section = soup.find('div', id='bilant')
+    except TransientError as e:
+        print("ERROR (transient):", e)
+        return jsonify({'error': f'Service temporarily unavailable, try again shortly ({e})'}), 503
+    except Exception as e:
+        print("ERROR:", e)
+        return jsonify({'error': str(e)}), 500
 
-        if not bilant_section:
-            return None
+    def generate():
+        yield ndjson({"type": "filters", "url": search_url, "filters": ai_output, "sessionId": session_id})
+
+        cached = cached_results(search_url)
+        if cached is not None:
+            add_to_search_history(prompt, cached, search_url)
+            yield ndjson({
+                "type": "done",
+                "success": True,
+                "products": cached,
+                "count": len(cached),
+                "url": search_url,
+                "filters": ai_output,
+                "cached": True
+            })
+            return
 
-        # 2. Find the table inside that section
-        table = bilant_section.find('table')
-        if not table:
-            return None
+        valid = []
+        try:
+            pipeline = VendorPipeline(engine)
+            for res in engine.iterate(pipeline.stream_listing(search_url)):
+                if not res or not res[2]:
+                    continue
+                product = to_product_json(res)
+                valid.append(product)
+                yield ndjson({"type": "product", "product": product})
+
+            sort_products(valid)
+            store_results(search_url, valid)
+            add_to_search_history(prompt, valid, search_url)
+
+            yield ndjson({
+                "type": "done",
+                "success": True,
+                "products": valid,
+                "count": len(valid),
+                "url": search_url,
+                "filters": ai_output,
+                "cached": False
+            })
 
-        tbody = table.find('tbody')
-        rows = tbody.find_all('tr') if tbody else table.find_all('tr')
+        except Exception as e:
+            print("ERROR:", e)
+            yield ndjson({"type": "error", "error": str(e)})
 
-        if len(rows) < 3:
-            return None
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
-        last_row = rows[-3]
-        last_row_cells = last_row.find_all('td')
 
-        if not last_row_cells:
-            return None
 
-        oldest_year = int(clean_num(last_row_cells[0].get_text(strip=True)))
-        age = 2025 - oldest_year
+# ===================================================================
+# ADMIN: VENDOR SCORING ANALYTICS
+# ===================================================================
 
-        first_row = rows[0]
-        cells = first_row.find_all('td')
+# /api/admin/* requires this in the X-Admin-Token header. Unset, the admin
+# endpoints are closed except when the app runs in debug mode.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
 
-        if len(cells) >= 8:
-            cifra_afaceri = int(clean_num(cells[1].get_text()))
-            profit = int(clean_num(cells[2].get_text()))
-            datorii = int(clean_num(cells[3].get_text()))
-            active_imob = int(clean_num(cells[4].get_text()))
-            active_cir = int(clean_num(cells[5].get_text()))
-            nr_salariati = int(clean_num(cells[7].get_text()))
+# query param -> scoring.SMALL_BUSINESS_LIMITS key
+LIMIT_PARAMS = {
+    'maxTurnover': 'max_turnover',
+    'maxAssets': 'max_assets',
+    'maxEmployees': 'max_employees',
+}
 
-            active = active_imob + active_cir
 
-            return cifra_afaceri, active, nr_salariati, profit, datorii, age
+@api.route('/api/admin/scoring', methods=['GET'])
+def scoring_analytics():
+    """
+    Scores every stored company (no scraping) and returns a summary, a
+    score histogram and the top vendors. Query params: `bins` (default
+    10), `top` (default 20) and what-if thresholds `maxTurnover`,
+    `maxAssets`, `maxEmployees`. With a threshold set, the results use it
+    and `whatIf` lists the companies whose verdict changes.
+    """
+    if ADMIN_TOKEN:
+        if request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+            return jsonify({'error': 'Forbidden'}), 403
+    elif not current_app.debug:
+        return jsonify({'error': 'Forbidden (set ADMIN_TOKEN)'}), 403
 
-        return None
+    try:
+        overrides = {
+            key: float(request.args[param])
+            for param, key in LIMIT_PARAMS.items()
+            if request.args.get(param) not in (None, '')
+        }
+        bins = min(max(int(request.args.get('bins', 10)), 1), 100)
+        top = min(max(int(request.args.get('top', 20)), 0), 1000)
+    except ValueError:
+        return jsonify({'error': 'bins, top and thresholds must be numbers'}), 400
+    if not all(math.isfinite(value) for value in overrides.values()):
+        return jsonify({'error': 'thresholds must be finite numbers'}), 400
+
+    start = time.perf_counter()
+    limits = dict(SMALL_BUSINESS_LIMITS, **overrides)
+    table = bulk_scoring.load_table()
+    valid, scores = table.score(limits)
+
+    result = {
+        'limits': limits,
+        'summary': bulk_scoring.summary(table, valid, scores),
+        'histogram': bulk_scoring.histogram(valid, scores, bins),
+        'top': bulk_scoring.top_k(table, valid, scores, top),
+    }
+    if overrides:
+        result['whatIf'] = bulk_scoring.what_if(table, limits)
+    result['engine'] = 'numpy' if bulk_scoring.np is not None else 'python'
+    result['elapsedMs'] = round((time.perf_counter() - start) * 1000, 2)
+    return jsonify(result)
 
-    except Exception as e:
-        return None
 
+# ===================================================================
+# HEALTH & HISTORY ENDPOINTS
+# ===================================================================
 
-def check_small_business(cifra, active, nr):
-    return cifra <= 50_000_000 and active <= 50_000_000 and nr < 50
+@api.route('/api/health', methods=['GET'])
+def health():
+    return jsonify({
+        'status': 'ok',
+        'caches': {
+            'filters': filters_cache.stats(),
+            'companies': company_store.stats(),
+            'products': product_cache.stats(),
+            'results': results_cache.stats(),
+            'http': http_cache.stats() if http_cache is not None else None,
+        },
+        'jobs': search_jobs.stats(),
+        'hosts': rate_limit.stats(),
+        'breakers': resilience.stats()
+    })
 
 
-def compute_credibility(profit, datorii, age):
+@api.route('/api/search-history', methods=['GET'])
+def get_history():
+    """
+    Paged history, oldest first within a page. Query params: `limit`
+    (default 50) and `before` (an ID; pass back `nextBefore` for older
+    searches). `nextBefore` is null on the last page.
+    """
     try:
-        f = profit / (profit + (abs(datorii)**0.5)) if profit + abs(datorii)**0.5 != 0 else 0
-        a = age / (age + 3)
-        return int((0.8*f + 0.2*a)*100)
-    except:
-        return 0
+        limit = min(int(request.args.get('limit', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+        before = request.args.get('before')
+        before = int(before) if before not in (None, '') else None
+    except ValueError:
+        return jsonify({'error': 'limit and before must be integers'}), 400
 
+    items, next_before = search_history.page(max(limit, 1), before)
+    return jsonify({"success": True, "history": items, "nextBefore": next_before})
 
-def process_url(product, companies_cache, links_dict, lock):
-    url = product['url']
-    session = requests.Session()
 
+@api.route('/api/search-history', methods=['POST'])
+def save_history_selection():
+    """Saves which past searches are selected: {"selectedIds": [id, ...]}."""
+    data = request.get_json() or {}
     try:
-        vendor_page = extr_vendor_page(url, session)
-        if not vendor_page:
-            return None
-
-        name, code = extr_vendor_name(vendor_page, session)
-        if not name or not code:
-            return None
-
-        with lock:
-            if name in companies_cache:
-                is_valid = companies_cache[name]['is_valid']
-                score = companies_cache[name]['score']
-                return url, name, is_valid, score, product
-
-        firm_url = create_company_site_url(name, code)
-        fin = get_latest_financials(firm_url, session)
+        selected = [int(i) for i in data.get('selectedIds', [])]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'selectedIds must be a list of integers'}), 400
 
-        if not fin:
-            res = {'is_valid': False, 'score': 0}
-        else:
-            cifra, active, nr, profit, datorii, age = fin
-            if check_small_business(cifra, active, nr):
-                score = compute_credibility(profit, datorii, age)
-                res = {'is_valid': True, 'score': score}
-            else:
-                res = {'is_valid': False, 'score': 0}
-
-        with lock:
-            companies_cache[name] = res
-
-        return url, name, res['is_valid'], res['score'], product
-
-    except:
-        return None
-    finally:
-        session.close()
-
-
-
-# ===================================================================
-# MAIN API ENDPOINT — FIXED TO USE AI CONVERSATION
-# ===================================================================
+    search_history.set_selected(selected)
+    return jsonify({"success": True, "selectedIds": selected})
 
-@app.route('/api/search', methods=['POST'])
-def search_products():
-    global conversation_state
 
+@api.route('/api/search-history/products', methods=['POST'])
+def history_products():
+    """
+    Merged, deduplicated products of past searches, read from the stored
+    snapshots (no scraping, no LLM). Body: {"ids": [...]} or, as the
+    history page sends it, {"prompts": [...]} (latest search per prompt).
+    """
+    data = request.get_json() or {}
     try:
-        data = request.get_json()
-        prompt = data.get('prompt', '').strip()
-
-        if not prompt:
-            return jsonify({'error': 'Prompt is required'}), 400
-
-        print("User prompt:", prompt)
-
-        # RESET conversation
-        if prompt.lower() in ["reset", "sterge", "șterge", "reset conversatie", "sterge tot"]:
-            reset_conversation()
-            conversation_state = None
-            return jsonify({"success": True, "message": "Context resetat."})
-
-        # FIRST MESSAGE
-        if conversation_state is None:
-            warm_msg, ai_output = start_conversation(prompt)
-            conversation_state = ai_output
-            print("AI:", warm_msg)
+        if data.get('ids'):
+            ids = [int(i) for i in data['ids']]
         else:
-            # FOLLOW-UP MESSAGE
-            ai_output = continue_conversation(prompt)
-            conversation_state = ai_output
-            print("AI: Filtre actualizate")
-
-        # Build eMAG URL
-        search_url = build_emag_url_from_ai(ai_output, load_emag_data())
-        print("Generated URL:", search_url)
-
-        # SCRAPE PRODUCTS
-        products = get_product_list(search_url)
-        seen = {}
-        unique = []
-
-        for p in products:
-            url = p['url']
-            if url not in seen:
-                seen[url] = True
-                unique.append(p)
-
-        # VENDOR CHECK
-        companies_cache = {}
-        links_dict = {}
-        lock = Lock()
-        valid = []
-
-        with ThreadPoolExecutor(max_workers=10) as exec:
-            futures = {
-                exec.submit(process_url, p, companies_cache, links_dict, lock): p
-                for p in unique
-            }
-
-            for f in as_completed(futures):
-                res = f.result()
-                if not res:
-                    continue
-                url, company_name, is_valid, score, prod = res
-                if is_valid:
-                    valid.append({
-                        "url": url,
-                        "productName": prod.get("name", "Unknown"),
-                        "companyName": company_name,
-                        "credibilityScore": score,
-                        "imageUrl": prod.get("image", ""),
-                        "price": prod.get("price", None)
-                    })
-
-        valid.sort(key=lambda x: x['credibilityScore'], reverse=True)
-
-        add_to_search_history(prompt, len(valid))
-
-        return jsonify({
-            "success": True,
-            "products": valid,
-            "count": len(valid),
-            "url": search_url,
-            "filters": ai_output
-        })
-
-    except Exception as e:
-        print("ERROR:", e)
-        return jsonify({'error': str(e)}), 500
-
-
-
-# ===================================================================
-# HEALTH & HISTORY ENDPOINTS
-# ===================================================================
-
-@app.route('/api/health', methods=['GET'])
-def health():
-    return jsonify({'status': 'ok'})
+            ids = search_history.ids_for_prompts([str(p) for p in data.get('prompts', [])])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be a list of integers'}), 400
 
+    products = search_history.merged_products(ids)
+    return jsonify({"success": True, "products": products, "count": len(products)})
 
-@app.route('/api/search-history', methods=['GET'])
-def get_history():
-    return jsonify({"success": True, "history": load_search_history()})
-
-@app.route('/api/create-checkout-session', methods=['POST'])
+@api.route('/api/create-checkout-session', methods=['POST'])
 def create_checkout_session():
     """Create Stripe checkout session"""
     try:
@@ -578,5 +493,13 @@ def create_checkout_session():
 # START FLASK
 # ===================================================================
 
+def create_app():
+    """WSGI app factory (gunicorn: "wsgi:app" or "flask_api:create_app()")."""
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+    return app
+
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000, host="0.0.0.0")
\ No newline at end of file
+    create_app().run(debug=True, port=5000, host="0.0.0.0")
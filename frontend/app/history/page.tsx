@@ -92,7 +92,8 @@ export default function HistoryPage() {
           headers: {
             'Content-Type': 'application/json',
           },
-          body: JSON.stringify({ prompts: selectedPrompts }),
+          // ids pick the exact searches; prompts are kept for older backends
+          body: JSON.stringify({ ids: selectedIds, prompts: selectedPrompts }),
         })
         
         const productsData = await productsResponse.json()
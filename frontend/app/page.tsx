@@ -23,6 +23,23 @@ interface Message {
   timestamp: Date
 }
 
+// One conversation per browser tab; "New Chat" starts a new one
+const SESSION_KEY = 'chatSessionId'
+
+const newSessionId = () =>
+  (typeof crypto !== 'undefined' && 'randomUUID' in crypto)
+    ? crypto.randomUUID()
+    : Math.random().toString(36).slice(2) + Date.now().toString(36)
+
+const getSessionId = () => {
+  let id = sessionStorage.getItem(SESSION_KEY)
+  if (!id) {
+    id = newSessionId()
+    sessionStorage.setItem(SESSION_KEY, id)
+  }
+  return id
+}
+
 export default function Home() {
   const [prompt, setPrompt] = useState('')
   const [loading, setLoading] = useState(false)
@@ -93,6 +110,7 @@ export default function Home() {
   }
 
   const handleNewChat = () => {
+    sessionStorage.setItem(SESSION_KEY, newSessionId())
     setProducts([])
     setMessages([{
       role: 'assistant',
@@ -133,25 +151,61 @@ export default function Home() {
         requestBody.userLongitude = userLocation.lon
       }
 
-      const response = await fetch('http://localhost:5000/api/search', {
+      const response = await fetch('http://localhost:5000/api/search/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Session-ID': getSessionId(),
         },
         body: JSON.stringify(requestBody),
       })
 
-      const data = await response.json()
+      // Errors and "reset" replies are plain JSON; searches stream NDJSON events
+      let data: any = null
+      if (!response.body || !(response.headers.get('Content-Type') || '').includes('ndjson')) {
+        data = await response.json()
+      } else {
+        const reader = response.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ''
+        setProducts([])
+
+        while (true) {
+          const { done, value } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+
+          const lines = buffer.split('\n')
+          buffer = lines.pop() || ''
+
+          for (const line of lines) {
+            if (!line.trim()) continue
+            const event = JSON.parse(line)
+            if (event.type === 'product') {
+              // Show each validated product as soon as its vendor is checked
+              setProducts(prev => [...prev, event.product])
+            } else if (event.type === 'done') {
+              data = event
+            } else if (event.type === 'error') {
+              data = { success: false, error: event.error }
+            }
+          }
+        }
+      }
       
-      if (data.success) {
-        setProducts(data.products)
+      if (data && data.success) {
+        if (data.products) {
+          setProducts(data.products)
+        }
         
         // Remove loading message and add response
         setMessages(prev => {
           const newMessages = prev.slice(0, -1) // Remove loading message
           return [...newMessages, {
             role: 'assistant',
-            content: `I found ${data.products.length} products matching your search! Check them out on the right.`,
+            content: data.products
+              ? `I found ${data.products.length} products matching your search! Check them out on the right.`
+              : data.message,
             timestamp: new Date()
           }]
         })
@@ -160,7 +214,7 @@ export default function Home() {
           const newMessages = prev.slice(0, -1)
           return [...newMessages, {
             role: 'assistant',
-            content: 'Sorry, I encountered an error: ' + (data.error || 'Failed to search products'),
+            content: 'Sorry, I encountered an error: ' + ((data && data.error) || 'Failed to search products'),
             timestamp: new Date()
           }]
         })
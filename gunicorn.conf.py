@@ -0,0 +1,30 @@
+"""
+gunicorn settings for the Flask API:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Tunable through the environment: BIND, WEB_CONCURRENCY (worker
+processes), GUNICORN_THREADS (threads per worker), GUNICORN_TIMEOUT.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+
+# Searches are mostly waiting on eMAG / listafirme.ro, with HTML parsing in
+# between: a few processes for the parsing, threads for the waiting.
+workers = int(os.getenv('WEB_CONCURRENCY', min(2 * multiprocessing.cpu_count() + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+
+# A cold search (listing + vendor checks) can take tens of seconds
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker imports the app itself: the fetch engine starts its event
+# loop thread and SQLite connections per process, neither survives fork().
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,226 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from cache_store import open_sqlite, SQLiteConnections
+
+
+# =====================================================
+# SEARCH HISTORY (SQLite, append-only)
+# =====================================================
+
+HISTORY_DB = os.getenv('HISTORY_DB', 'search_history.db')
+
+# Legacy whole-file history, imported once into the database
+SEARCH_HISTORY_FILE = os.getenv('SEARCH_HISTORY_FILE', 'search_history.json')
+
+# Retention: keep at most HISTORY_MAX_ENTRIES searches, and (when set) none
+# older than HISTORY_MAX_AGE_DAYS. 0 disables a limit.
+HISTORY_MAX_ENTRIES = int(os.getenv('HISTORY_MAX_ENTRIES', 1000))
+HISTORY_MAX_AGE_DAYS = int(os.getenv('HISTORY_MAX_AGE_DAYS', 0))
+
+# Retention runs on every Nth insert, not on each one
+RETENTION_EVERY = 50
+
+
+def _row_to_item(row):
+    id_, prompt, product_count, timestamp, selected = row
+    return {
+        'id': id_,
+        'prompt': prompt,
+        'productCount': product_count,
+        'timestamp': timestamp,
+        'selected': bool(selected),
+    }
+
+
+class SearchHistory:
+    """
+    One row per search. IDs come from AUTOINCREMENT, so they only grow and
+    are never reused after old rows are pruned. Items have the same shape
+    as the entries of the old search_history.json.
+
+    Each search also keeps a snapshot of its validated products, so past
+    results are served from storage instead of being scraped again.
+    """
+
+    def __init__(self, db_path=HISTORY_DB, max_entries=HISTORY_MAX_ENTRIES,
+                 max_age_days=HISTORY_MAX_AGE_DAYS, import_from=SEARCH_HISTORY_FILE):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._connections = SQLiteConnections(db_path)
+        self._inserts = 0
+
+        conn = open_sqlite(db_path)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " prompt TEXT NOT NULL,"
+                " product_count INTEGER NOT NULL DEFAULT 0,"
+                " timestamp TEXT NOT NULL,"
+                " selected INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS searches_timestamp ON searches(timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS searches_prompt ON searches(prompt)")
+            # Validated product list of each search, as returned by /api/search
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " search_id INTEGER PRIMARY KEY, url TEXT, products TEXT NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.close()
+
+        if import_from:
+            self.import_json(import_from)
+
+    def _conn(self):
+        return self._connections.get()
+
+    # ---------- legacy import ----------
+
+    def import_json(self, path):
+        """Copies the old JSON history in once; later calls are no-ops."""
+        if not os.path.exists(path):
+            return 0
+
+        with self._conn() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return 0
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            except Exception as e:
+                print(f"[HISTORY] Could not read {path}: {e}")
+                entries = []
+
+            rows = [
+                (e.get('id'), e.get('prompt', ''), e.get('productCount', 0),
+                 e.get('timestamp') or datetime.now().isoformat(), int(bool(e.get('selected'))))
+                for e in entries if isinstance(e, dict)
+            ]
+            # Old IDs are kept (the frontend may still reference them)
+            # unless two entries share one, which len()-based IDs allowed
+            seen = set()
+            for row in rows:
+                if row[0] is None or row[0] in seen:
+                    conn.execute(
+                        "INSERT INTO searches (prompt, product_count, timestamp, selected) VALUES (?, ?, ?, ?)",
+                        row[1:],
+                    )
+                else:
+                    seen.add(row[0])
+                    conn.execute("INSERT OR IGNORE INTO searches VALUES (?, ?, ?, ?, ?)", row)
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (str(time.time()),))
+
+        print(f"[HISTORY] Imported {len(rows)} searches from {path} into {self.db_path}.")
+        return len(rows)
+
+    # ---------- writes ----------
+
+    def add(self, prompt, products, search_url=None):
+        """Records a search and its product snapshot; returns the new ID."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT INTO searches (prompt, product_count, timestamp) VALUES (?, ?, ?)",
+                (prompt, len(products), datetime.now().isoformat()),
+            )
+            conn.execute(
+                "INSERT INTO snapshots VALUES (?, ?, ?)",
+                (cur.lastrowid, search_url, json.dumps(products, ensure_ascii=False)),
+            )
+        self._inserts += 1
+        if self._inserts % RETENTION_EVERY == 1:
+            self.apply_retention()
+        return cur.lastrowid
+
+    def apply_retention(self):
+        with self._conn() as conn:
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM searches WHERE id <= "
+                    " (SELECT id FROM searches ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            if self.max_age_days:
+                cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+                conn.execute("DELETE FROM searches WHERE timestamp < ?", (cutoff,))
+            conn.execute("DELETE FROM snapshots WHERE search_id NOT IN (SELECT id FROM searches)")
+
+    def set_selected(self, ids):
+        """Marks exactly `ids` as selected (the history page's "Save Selection")."""
+        ids = [int(i) for i in ids]
+        marks = ",".join("?" * len(ids))
+        with self._conn() as conn:
+            conn.execute("UPDATE searches SET selected = 0 WHERE selected = 1")
+            if ids:
+                conn.execute(f"UPDATE searches SET selected = 1 WHERE id IN ({marks})", ids)
+
+    # ---------- reads ----------
+
+    def page(self, limit=50, before=None):
+        """
+        The `limit` most recent searches with id < `before` (all when None),
+        oldest first like the old JSON file. Returns (items, next_before):
+        pass next_before back to get the previous page; None on the last one.
+        """
+        query = "SELECT id, prompt, product_count, timestamp, selected FROM searches"
+        params = []
+        if before is not None:
+            query += " WHERE id < ?"
+            params.append(before)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._conn().execute(query, params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        items = [_row_to_item(r) for r in reversed(rows)]
+        return items, (rows[-1][0] if more else None)
+
+    def ids_for_prompts(self, prompts):
+        """Latest search with a snapshot for each prompt."""
+        prompts = list(dict.fromkeys(prompts))
+        if not prompts:
+            return []
+        marks = ",".join("?" * len(prompts))
+        rows = self._conn().execute(
+            f"SELECT MAX(s.id) FROM searches s JOIN snapshots p ON p.search_id = s.id"
+            f" WHERE s.prompt IN ({marks}) GROUP BY s.prompt",
+            prompts,
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def merged_products(self, ids):
+        """
+        Products of several past searches, deduplicated by URL (the
+        higher credibility score wins) and sorted by score. Each product
+        carries the prompt of the search it came from as `searchPrompt`.
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        rows = self._conn().execute(
+            f"SELECT s.prompt, p.products FROM snapshots p JOIN searches s ON s.id = p.search_id"
+            f" WHERE p.search_id IN ({marks}) ORDER BY p.search_id DESC",
+            ids,
+        ).fetchall()
+
+        merged = {}
+        for prompt, products in rows:
+            for product in json.loads(products):
+                url = product.get('url')
+                best = merged.get(url)
+                if best is None or product.get('credibilityScore', 0) > best.get('credibilityScore', 0):
+                    merged[url] = dict(product, searchPrompt=prompt)
+
+        return sorted(merged.values(), key=lambda p: p.get('credibilityScore', 0), reverse=True)
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+
+
+search_history = SearchHistory()
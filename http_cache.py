@@ -0,0 +1,230 @@
+import os
+import re
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+
+from cache_store import open_sqlite, SQLiteConnections
+
+
+# =====================================================
+# HTTP RESPONSE CACHE (scraped pages, on disk)
+# =====================================================
+#
+# Raw pages fetched by the engine, keyed by URL and stored zlib-compressed
+# in SQLite (shared by every worker process). Freshness comes from the
+# first matching HTTP_CACHE_RULES pattern, else from Cache-Control
+# max-age / Expires. Stale entries with an ETag or Last-Modified are
+# revalidated with a conditional GET; a 304 renews them without
+# downloading the page again. Cache-Control: no-store is never stored.
+#
+# The database is bounded by HTTP_CACHE_MAX_MB of compressed bodies; the
+# least recently used pages are evicted first.
+
+HTTP_CACHE = os.getenv('HTTP_CACHE', '1') != '0'
+HTTP_CACHE_DB = os.getenv('HTTP_CACHE_DB', 'http_cache.db')
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_MB', 200)) * 1024 * 1024
+
+DAY = 24 * 3600
+
+# (URL pattern, TTL in seconds) - the first match wins over the response
+# headers. TTL 0 keeps the page only for conditional requests.
+HTTP_CACHE_RULES = [
+    # Balance sheets change once a year
+    (re.compile(r'^https?://listafirme\.ro/'), int(os.getenv('HTTP_CACHE_LISTAFIRME_TTL', 30 * DAY))),
+    # Vendor pages (name, CUI) change rarely
+    (re.compile(r'^https?://www\.emag\.ro/vendors/vendor/'), int(os.getenv('HTTP_CACHE_VENDOR_TTL', DAY))),
+    # Product pages: only the vendor link is read
+    (re.compile(r'^https?://www\.emag\.ro/.*/pd/'), int(os.getenv('HTTP_CACHE_PRODUCT_TTL', DAY))),
+    # Listing pages: prices and stock move all the time
+    (re.compile(r'^https?://www\.emag\.ro/'), 0),
+]
+
+# Hits refresh an entry's LRU position at most this often
+TOUCH_INTERVAL = 60
+
+# The size bound is checked every Nth store
+EVICT_EVERY = 50
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def rule_ttl(url):
+    for pattern, ttl in HTTP_CACHE_RULES:
+        if pattern.match(url):
+            return ttl
+    return None
+
+
+def freshness(url, headers, now):
+    """Seconds the response stays fresh, or None when it must not be stored."""
+    cc = parse_cache_control(headers.get('Cache-Control'))
+    if 'no-store' in cc:
+        return None
+
+    ttl = rule_ttl(url)
+    if ttl is not None:
+        return ttl
+    if 'no-cache' in cc:
+        return 0
+    if 'max-age' in cc:
+        try:
+            return max(0, int(cc['max-age']))
+        except ValueError:
+            return 0
+    if headers.get('Expires'):
+        try:
+            return max(0, parsedate_to_datetime(headers['Expires']).timestamp() - now)
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class CachedPage:
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, url, body, etag, last_modified, expires):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    def __init__(self, path=HTTP_CACHE_DB, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._connections = SQLiteConnections(path)
+        self._stores = 0
+        self._lock = threading.Lock()
+
+        conn = open_sqlite(path)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL,"
+                " etag TEXT, last_modified TEXT, expires REAL NOT NULL, used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages(used)")
+        conn.close()
+
+    def _conn(self):
+        return self._connections.get()
+
+    def lookup(self, url):
+        """
+        The stored page (fresh or not), or None. Fresh pages count as hits,
+        missing or stale ones as misses (`revalidated` counts the 304s).
+        """
+        row = self._conn().execute(
+            "SELECT body, etag, last_modified, expires, used FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        body, etag, last_modified, expires, used = row
+        now = time.time()
+        if now < expires:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if now - used > TOUCH_INTERVAL:
+            with self._conn() as conn:
+                conn.execute("UPDATE pages SET used = ? WHERE url = ?", (now, url))
+        return CachedPage(url, zlib.decompress(body).decode('utf-8'), etag, last_modified, expires)
+
+    def store(self, url, text, headers):
+        now = time.time()
+        ttl = freshness(url, headers, now)
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        # Without freshness or a validator the copy could never be used
+        if ttl is None or (ttl <= 0 and not etag and not last_modified):
+            return
+
+        body = zlib.compress(text.encode('utf-8'), 6)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, len(body), etag, last_modified, now + ttl, now),
+            )
+
+        with self._lock:
+            self._stores += 1
+            evict = self._stores % EVICT_EVERY == 1
+        if evict:
+            self.evict()
+
+    def revalidated_page(self, page, headers):
+        """A 304 for `page`: renew its freshness (and validators) in place."""
+        now = time.time()
+        ttl = freshness(page.url, headers, now) or 0
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE pages SET expires = ?, used = ?, etag = COALESCE(?, etag),"
+                " last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (now + ttl, now, headers.get('ETag'), headers.get('Last-Modified'), page.url),
+            )
+        self.revalidated += 1
+        return page.body
+
+    def delete(self, url):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+    def evict(self):
+        """Drops least recently used pages until the total is under 90% of the bound."""
+        with self._conn() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = total - int(self.max_bytes * 0.9)
+            freed = 0
+            doomed = []
+            for url, size in conn.execute("SELECT url, size FROM pages ORDER BY used"):
+                doomed.append((url,))
+                freed += size
+                if freed >= target:
+                    break
+            conn.executemany("DELETE FROM pages WHERE url = ?", doomed)
+        print(f"[HTTP CACHE] Evicted {len(doomed)} pages ({freed // 1024} KB).")
+
+    def stats(self):
+        count, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': count,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'revalidated': self.revalidated,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+http_cache = HTTPCache() if HTTP_CACHE else None
@@ -0,0 +1,132 @@
+import os
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import rate_limit
+import resilience
+
+
+# =====================================================
+# SHARED POOLED HTTP CLIENT
+# =====================================================
+
+# (connect, read) seconds, applied to every request that doesn't set one
+DEFAULT_TIMEOUT = (5, 15)
+
+# Keep-alive connections kept open per host. eMAG serves listing, product
+# and vendor pages, so it gets the larger pool.
+HOST_POOLS = {
+    'www.emag.ro': int(os.getenv('EMAG_POOL_SIZE', 32)),
+    'listafirme.ro': int(os.getenv('LISTAFIRME_POOL_SIZE', 16)),
+}
+DEFAULT_POOL = 10
+
+
+def _parse_host_map(spec):
+    """'www.emag.ro=http://127.0.0.1:8900,listafirme.ro=...' -> {host: base URL}"""
+    mapping = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        host, _, target = item.partition('=')
+        mapping[host.strip()] = target.strip().rstrip('/')
+    return mapping
+
+
+# Sends requests for a scraped host to another base URL (load tests run
+# against a local fake of eMAG / listafirme.ro). Empty in production.
+HOST_MAP = _parse_host_map(os.getenv('SCRAPER_HOST_MAP', ''))
+
+
+def rewrite_url(url):
+    if not HOST_MAP:
+        return url
+    parts = urlsplit(url)
+    target = HOST_MAP.get(parts.netloc)
+    if target is None:
+        return url
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{target}{parts.path}{query}"
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that fills in DEFAULT_TIMEOUT when the caller passes none."""
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class RoutedSession(requests.Session):
+    """
+    requests.Session that applies HOST_MAP to every request. When
+    `rate_limited`, requests to scraped hosts are also paced by their
+    rate_limit limiter and retried through the host's circuit breaker
+    (resilience); exhausted transient failures raise TransientError.
+    """
+
+    def __init__(self, rate_limited=True):
+        super().__init__()
+        self.rate_limited = rate_limited
+
+    def request(self, method, url, *args, **kwargs):
+        limiter = limiter_for(urlsplit(url).netloc) if self.rate_limited else None
+        if limiter is None:
+            return super().request(method, rewrite_url(url), *args, **kwargs)
+
+        send = super().request
+
+        def send_once():
+            limiter.wait()
+            start = time.monotonic()
+            try:
+                r = send(method, rewrite_url(url), *args, **kwargs)
+            except requests.RequestException:
+                limiter.record(None, time.monotonic() - start)
+                raise
+            limiter.record(r.status_code, time.monotonic() - start, r.headers.get('Retry-After'))
+            if r.status_code == 429:
+                raise resilience.RateLimited(f"HTTP 429 from {url}")
+            if resilience.is_transient_status(r.status_code):
+                raise resilience.TransientError(f"HTTP {r.status_code} from {url}")
+            return r
+
+        return resilience.call_with_retry(send_once, resilience.breaker_for(limiter.host))
+
+
+def build_session(rate_limited=True):
+    s = RoutedSession(rate_limited)
+
+    default = TimeoutHTTPAdapter(pool_connections=DEFAULT_POOL, pool_maxsize=DEFAULT_POOL)
+    s.mount('http://', default)
+    s.mount('https://', default)
+
+    # Longest prefix wins, so these take over for the scraped hosts
+    for host, size in HOST_POOLS.items():
+        s.mount(f'https://{host}/', TimeoutHTTPAdapter(pool_connections=1, pool_maxsize=size))
+
+    return s
+
+
+# One session for the whole process: connections to eMAG and listafirme.ro
+# are reused across threads, products and requests.
+session = build_session()
+
+
+def get(url, **kwargs):
+    return session.get(url, **kwargs)
+
+
+def host_pool_size(host):
+    return HOST_POOLS.get(host, DEFAULT_POOL)
+
+
+def limiter_for(host):
+    """Rate limiter of a scraped host (None for others); concurrency never exceeds its pool."""
+    return rate_limit.limiter_for(host, host_pool_size(host))
@@ -0,0 +1,235 @@
+import re
+
+from catalog import load_catalog, fold
+
+
+# =====================================================
+# LOCAL INTENT PARSER
+# =====================================================
+#
+# Short prompts ("tricou galben", "pijamale negre si galbene",
+# "blugi sub 200 lei") are resolved from the catalog alone, without a
+# Gemini round-trip. The parser only answers when every word of the prompt
+# is understood; anything else (negations, "cu dungi", English, no
+# category, two categories) returns None and the caller asks the model.
+
+# Filters whose option labels are matched as words in the prompt
+WORD_FILTERS = ("Culoare", "Material", "Brand", "Pentru")
+
+# Words that carry no search intent
+STOPWORDS = frozenset("""
+    salut buna hei hello
+    vreau vrem vrea as am aveti doresc dori caut cautam cumpar cumpara
+    achizitionez comand comanda gaseste gasesti arata arati
+    poti puteti da dai imi mi ma mie eu te va rog multumesc
+    sa si sau un o niste cateva ceva
+    de la in pe din cu pentru
+    culoare culoarea culori material materialul brand brandul marca
+    pret pretul lei ron
+""".split())
+
+# Inflected forms the suffix rules below cannot derive
+IRREGULAR_FORMS = {
+    "negru": ("neagra", "negre", "negri"),
+    "rosu": ("rosie", "rosii", "rosi"),
+    "verde": ("verzi",),
+    "albastru": ("albastra", "albastre", "albastri"),
+    "femei": ("femeie", "dama", "dame"),
+    "fete": ("fata",),
+    "baieti": ("baiat",),
+    "barbati": ("barbat", "barbatesc", "barbatesti"),
+}
+
+# Price phrases: "sub 100 lei", "pana in 100", "intre 50 si 200 lei"
+_NUM = r"(\d{1,3}(?:\.\d{3})+|\d+)"
+_CURRENCY = r"(?:\s*(?:lei|ron))?"
+PRICE_PATTERNS = (
+    (re.compile(rf"\b(?:sub|maxim|max|pana (?:in|la)) {_NUM}{_CURRENCY}\b"),
+     lambda m: (0, _price(m.group(1)))),
+    (re.compile(rf"\bintre {_NUM}{_CURRENCY} (?:si|-) {_NUM}{_CURRENCY}\b"),
+     lambda m: (_price(m.group(1)), _price(m.group(2)))),
+    (re.compile(rf"\b{_NUM} ?- ?{_NUM}{_CURRENCY}\b"),
+     lambda m: (_price(m.group(1)), _price(m.group(2)))),
+)
+
+_CLEAN_RE = re.compile(r"[^a-z0-9&'\-.]+")
+_TOKEN_RE = re.compile(r"[a-z0-9&']+")
+
+
+def _price(text):
+    return int(text.replace(".", ""))
+
+
+# =====================================================
+# ROMANIAN INFLECTIONS
+# =====================================================
+
+def adjective_forms(word):
+    """'galben' -> galben, galbena, galbene, galbeni (+ irregular table)."""
+    forms = {word}
+    if word.endswith("iu"):  # portocaliu, argintiu, auriu
+        forms.update((word[:-1] + "e", word[:-1] + "i"))
+    elif word.endswith("u"):  # negru, rosu, albastru
+        stem = word[:-1]
+        forms.update(stem + s for s in ("a", "e", "i"))
+    elif word.endswith("e"):  # verde
+        forms.add(word[:-1] + "i")
+    elif word[-1] not in "aio":  # alb, galben, transparent, multicolor
+        forms.update(word + s for s in ("a", "e", "i"))
+    forms.update(IRREGULAR_FORMS.get(word, ()))
+    return forms
+
+
+def noun_forms(plural):
+    """'tricouri' -> tricouri, tricourile, tricou, tricoul (+ irregular table)."""
+    forms = {plural, plural + "le"}
+    singulars = set()
+    if plural.endswith("uri"):  # tricouri -> tricou, treninguri -> trening
+        singulars.update((plural[:-2], plural[:-3]))
+    elif plural.endswith("le"):  # pijamale
+        singulars.update((plural[:-2], plural[:-2] + "ua"))
+    elif plural.endswith("e"):  # hanorace
+        singulars.add(plural[:-1])
+    elif plural.endswith("i"):  # camasi, pantaloni, blugi
+        singulars.update((plural[:-1], plural[:-1] + "a"))
+    for s in singulars:
+        forms.add(s)
+        if s.endswith("u"):
+            forms.add(s + "l")
+        elif s[-1] not in "aei":
+            forms.add(s + "ul")
+    forms.update(IRREGULAR_FORMS.get(plural, ()))
+    return forms
+
+
+def label_forms(label, inflect):
+    """All surface forms of a (possibly multi-word) label; the last word is inflected."""
+    words = fold(label).split()
+    if not words:
+        return set()
+    head = " ".join(words[:-1])
+    return {f"{head} {form}".strip() for form in inflect(words[-1])}
+
+
+def brand_forms(label):
+    """'Jack & Jones' -> 'jack & jones', 'jack jones', 'jackjones'."""
+    folded = fold(label)
+    return {
+        folded,
+        re.sub(r"\s+", " ", re.sub(r"[^a-z0-9]", " ", folded)).strip(),
+        re.sub(r"[^a-z0-9]", "", folded),
+    }
+
+
+# =====================================================
+# LEXICON (built once per catalog)
+# =====================================================
+
+class Lexicon:
+    """
+    Surface form -> meaning for one catalog version, plus one compiled
+    regex over all forms (longest first, so "bumbac organic" wins over
+    "bumbac"). Forms that mean two different things are dropped: the
+    parser would rather defer to the model than guess.
+    """
+
+    def __init__(self, catalog):
+        meanings = {}
+
+        def add(forms, meaning):
+            for form in forms:
+                if len(form) >= 3 and form not in STOPWORDS:
+                    meanings.setdefault(form, set()).add(meaning)
+
+        for cat in catalog.categories:
+            words = fold(cat["name"]).split()
+            add(noun_forms(words[0]), ("category", cat["name"]))
+            # "Tricouri barbati": the qualifier belongs to the category
+            for qualifier in words[1:]:
+                add(noun_forms(qualifier), ("qualifier", qualifier))
+
+        for fname in WORD_FILTERS:
+            for item in catalog.filters.get(fname, ()):
+                label = item["label"]
+                if fname == "Brand":
+                    forms = brand_forms(label)
+                elif fname == "Pentru":
+                    forms = label_forms(label, noun_forms)
+                else:
+                    forms = label_forms(label, adjective_forms)
+                add(forms, ("filter", fname, label))
+
+        self.terms = {}
+        for form, found in meanings.items():
+            # "barbati" is both a category qualifier and a "Pentru" option;
+            # as part of the category name it adds no filter
+            if {m[0] for m in found} == {"qualifier", "filter"}:
+                found = {m for m in found if m[0] == "qualifier"}
+            if len(found) == 1:
+                self.terms[form] = next(iter(found))
+
+        alternation = "|".join(
+            re.escape(form) for form in sorted(self.terms, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf"(?<![a-z0-9&'])(?:{alternation})(?![a-z0-9&'])")
+
+
+_lexicon = None  # (catalog, Lexicon)
+
+
+def get_lexicon():
+    global _lexicon
+    catalog = load_catalog()
+    if _lexicon is None or _lexicon[0] is not catalog:
+        _lexicon = (catalog, Lexicon(catalog))
+    return _lexicon[1]
+
+
+# =====================================================
+# PARSING
+# =====================================================
+
+def parse_intent(user_prompt):
+    """
+    {"category": ..., "filters": [...]} in the same shape as
+    agent.ai_select_filters, or None when the prompt is not fully understood.
+    """
+    text = " " + _CLEAN_RE.sub(" ", fold(user_prompt)) + " "
+    filters = []
+
+    for pattern, bounds in PRICE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            low, high = bounds(match)
+            if low > high:
+                return None
+            filters.append({"filter_name": "Pret", "min": low, "max": high})
+            text = text[:match.start()] + " " + text[match.end():]
+            break
+
+    lexicon = get_lexicon()
+    categories = set()
+    qualifiers = set()
+    seen = set()
+
+    for match in lexicon.pattern.finditer(text):
+        meaning = lexicon.terms[match.group(0)]
+        if meaning[0] == "category":
+            categories.add(meaning[1])
+        elif meaning[0] == "qualifier":
+            qualifiers.add(meaning[1])
+        elif meaning not in seen:
+            seen.add(meaning)
+            filters.append({"filter_name": meaning[1], "option_label": meaning[2]})
+
+    leftover = _TOKEN_RE.findall(lexicon.pattern.sub(" ", text))
+    if any(token not in STOPWORDS for token in leftover):
+        return None
+
+    if len(categories) != 1:
+        return None
+    category = categories.pop()
+    if qualifiers - set(fold(category).split()):
+        return None
+
+    return {"category": category, "filters": filters}
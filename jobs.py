@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_store import open_sqlite, SQLiteConnections
+
+
+# =====================================================
+# BACKGROUND JOBS
+# =====================================================
+#
+# Long searches run on a small, bounded worker pool instead of the web
+# thread that received them. A job's state is a plain JSON dict:
+#
+#     {"id", "status": queued|running|done|error, "stage", ...progress...,
+#      "createdAt", "updatedAt"}
+#
+# Workers report progress through Job.update(); clients poll the store.
+
+SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', 4))
+MAX_PENDING_JOBS = int(os.getenv('MAX_PENDING_JOBS', 100))
+
+# Finished jobs are kept this long for polling clients
+JOB_TTL = int(os.getenv('JOB_TTL', 3600))
+
+# Running jobs not updated for this long were lost with their process
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', 300))
+
+# Progress is written to the store at most this often (stage changes always)
+JOB_SAVE_INTERVAL = float(os.getenv('JOB_SAVE_INTERVAL', 0.5))
+
+FINISHED = ('done', 'error')
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MemoryJobStore:
+    """Jobs in this process only; fine with a single worker process."""
+
+    def __init__(self, ttl=JOB_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def save(self, state):
+        with self._lock:
+            self._jobs[state['id']] = json.loads(json.dumps(state))
+            now = time.time()
+            for job_id in [j for j, s in self._jobs.items()
+                           if s['status'] in FINISHED and now - s['updatedAt'] > self.ttl]:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            state = self._jobs.get(job_id)
+            return json.loads(json.dumps(state)) if state is not None else None
+
+
+class SQLiteJobStore:
+    """
+    Jobs visible to every worker process, so a client can poll any of
+    them, and kept across restarts. Jobs whose process died show up as
+    errors once they go stale.
+    """
+
+    def __init__(self, path, ttl=JOB_TTL, stale_after=JOB_STALE_AFTER):
+        self.path = path
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self._connections = SQLiteConnections(path)
+        self._last_sweep = 0.0
+
+        conn = open_sqlite(path)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs(updated)")
+        conn.close()
+
+    def save(self, state):
+        now = time.time()
+        with self._connections.get() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)",
+                (state['id'], json.dumps(state, ensure_ascii=False), state['updatedAt']),
+            )
+            if now - self._last_sweep > 60:
+                self._last_sweep = now
+                conn.execute("DELETE FROM jobs WHERE updated < ?", (now - max(self.ttl, self.stale_after),))
+
+    def get(self, job_id):
+        row = self._connections.get().execute(
+            "SELECT state FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        state = json.loads(row[0])
+        if state['status'] not in FINISHED and time.time() - state['updatedAt'] > self.stale_after:
+            state.update(status='error', stage='error', error='Job interrupted (worker restarted)')
+        return state
+
+
+def make_job_store():
+    """JOB_STORE=memory (default) or sqlite (JOB_DB, default jobs.db)."""
+    if os.getenv('JOB_STORE', 'memory').lower() == 'sqlite':
+        return SQLiteJobStore(os.getenv('JOB_DB', 'jobs.db'))
+    return MemoryJobStore()
+
+
+class Job:
+    """Handle a worker uses to report progress; saves are throttled."""
+
+    def __init__(self, store, state):
+        self.store = store
+        self.state = state
+        self._last_save = 0.0
+
+    @property
+    def id(self):
+        return self.state['id']
+
+    def update(self, force=False, **fields):
+        if 'stage' in fields and fields['stage'] != self.state.get('stage'):
+            force = True
+        self.state.update(fields)
+        self.state['updatedAt'] = time.time()
+        if force or self.state['updatedAt'] - self._last_save >= JOB_SAVE_INTERVAL:
+            self._last_save = self.state['updatedAt']
+            self.store.save(self.state)
+
+
+class JobQueue:
+    """
+    Bounded pool of job threads. At most `workers` jobs run at once and
+    at most `max_pending` wait; beyond that `submit` raises QueueFull.
+    """
+
+    def __init__(self, store, workers=SEARCH_WORKERS, max_pending=MAX_PENDING_JOBS):
+        self.store = store
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search-job')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, fn, *args, **fields):
+        """
+        Queues fn(job, *args). `fields` seed the job state. fn returns the
+        final fields (merged in with status "done"); exceptions mark the
+        job as "error".
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(f"{self._pending} searches already queued")
+            self._pending += 1
+
+        now = time.time()
+        state = dict(fields, id=uuid.uuid4().hex, status='queued', stage='queued',
+                     createdAt=now, updatedAt=now)
+        job = Job(self.store, state)
+        self.store.save(state)
+        # The worker mutates job.state from now on; callers get a copy
+        snapshot = dict(state)
+        self._executor.submit(self._run, job, fn, args)
+        return snapshot
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            self._pending -= 1
+        try:
+            job.update(status='running', force=True)
+            result = fn(job, *args) or {}
+            job.update(status='done', stage='done', force=True, **result)
+        except Exception as e:
+            print(f"[JOBS] {job.id} failed: {e}")
+            job.update(status='error', stage='error', error=str(e), force=True)
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {'pending': self._pending, 'maxPending': self.max_pending}
+
+
+search_jobs = JobQueue(make_job_store())
@@ -0,0 +1,321 @@
+"""
+Load test for the production server (wsgi.py) against a local fake of
+eMAG and listafirme.ro.
+
+For each worker count it starts the API (gunicorn when installed,
+otherwise N werkzeug processes sharing the port through SO_REUSEPORT)
+with the scrapers routed to the fake site through SCRAPER_HOST_MAP, runs
+concurrent searches (POST /api/search, then polling the job until it
+finishes) and reports throughput and latency. Prompts are simple enough
+for the local intent parser, so no Gemini calls are made, and every cache
+TTL is zero so each request does the full scrape + vendor check.
+
+    python load_test.py                       workers 1, 2, 4
+    python load_test.py --workers 1 2 4 8 --clients 32 --requests 200
+
+State (SQLite caches/sessions, search history) goes to a temporary
+directory; the repository files are not touched.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PROMPTS = [
+    "tricou galben",
+    "pijama neagra",
+    "blugi sub 200 lei",
+    "hanorac gri",
+    "camasa alba",
+    "pantaloni negri",
+    "tricouri rosii si verzi",
+    "trening Puma",
+]
+
+
+# =====================================================
+# FAKE EMAG / LISTAFIRME.RO
+# =====================================================
+
+def _page(body, kb=60):
+    block = '<div class="navbar-item"><a href="/cat/c">Categorie</a></div><script>var x = 1;</script>\n'
+    noise = block * (kb * 1024 // len(block) // 2)
+    return f'<html><head><title>fake</title></head><body>{noise}{body}{noise}</body></html>'
+
+
+def fake_listing(path, page, cards, last_page_cards):
+    # Product ids depend on the listing URL, so each search has its own products
+    base = zlib.crc32(re.sub(r'/p\d+/c$', '/c', path).encode()) % 100000
+    count = cards if page == 1 else last_page_cards
+    items = ''.join(
+        f'<div class="card-item js-product-data" data-url="/produs-{base}-{page}-{i}/pd/X{base}{page}{i}/">'
+        f'<img src="//img/{i}.jpg"><h2><a class="card-v2-title" href="#">Produs {base} {page} {i}</a></h2>'
+        f'<p class="product-new-price">{50 + i},99 <span>Lei</span></p></div>'
+        for i in range(count)
+    )
+    return _page(f'<div class="card-collection">{items}</div>')
+
+
+def fake_product(path, vendors):
+    vendor = zlib.crc32(path.encode()) % vendors
+    return _page(f'<div class="product-page-vendor"><a href="/vendors/vendor/v{vendor}/v?ref=see_vendor_page">Vandut de V{vendor}</a></div>')
+
+
+def fake_vendor(vendor):
+    return _page(
+        f'<p><strong>Denumirea companiei:</strong> FIRMA {vendor} SRL</p>'
+        f'<p><strong>Cod unic de inregistrare:</strong> {1000 + int(vendor)}</p>'
+    )
+
+
+def fake_company():
+    rows = ''.join(
+        f'<tr><td>{year}</td><td>1.200.000</td><td>150.000</td><td>80.000</td>'
+        f'<td>40.000</td><td>300.000</td><td>-</td><td>12</td></tr>'
+        for year in range(2024, 2009, -1)
+    )
+    return _page(f'<div id="bilant"><table><tbody>{rows}</tbody></table></div>')
+
+
+def make_fake_handler(latency, cards, vendors):
+    company_page = fake_company()
+
+    class FakeSite(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            path = self.path.split('?')[0]
+
+            if '/pd/' in path:
+                body = fake_product(path, vendors)
+            elif path.startswith('/vendors/vendor/'):
+                body = fake_vendor(path.split('/')[3].lstrip('v'))
+            elif path.startswith('/label/'):
+                m = re.search(r'/p(\d+)/c$', path)
+                page = int(m.group(1)) if m else 1
+                if page > 2:
+                    return self._send(404, 'not found')
+                body = fake_listing(path, page, cards, cards // 3)
+            elif re.match(r'^/[a-z0-9-]+-\d+/$', path):
+                body = company_page
+            else:
+                return self._send(404, 'not found')
+            self._send(200, body)
+
+        def _send(self, status, body):
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeSite
+
+
+def start_fake_site(latency, cards, vendors):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_fake_handler(latency, cards, vendors))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# =====================================================
+# SERVER UNDER TEST
+# =====================================================
+
+def have_gunicorn():
+    return shutil.which('gunicorn') is not None
+
+
+def start_api(workers, threads, port, fake_url, state_dir):
+    env = dict(
+        os.environ,
+        SCRAPER_HOST_MAP=f"www.emag.ro={fake_url},listafirme.ro={fake_url}",
+        SESSION_STORE='sqlite',
+        SESSION_DB=os.path.join(state_dir, 'sessions.db'),
+        CACHE_BACKEND='sqlite',
+        CACHE_DB=os.path.join(state_dir, 'cache.db'),
+        HISTORY_DB=os.path.join(state_dir, 'search_history.db'),
+        JOB_DB=os.path.join(state_dir, 'jobs.db'),
+        SEARCH_WORKERS=str(threads),
+        SEARCH_HISTORY_FILE=os.path.join(state_dir, 'search_history.json'),
+        COMPANY_DB=os.path.join(state_dir, 'companies.db'),
+        COMPANY_FACTS_TTL='0',
+        PRODUCT_CACHE_TTL='0',
+        RESULTS_CACHE_FRESH='0',
+        RESULTS_CACHE_STALE='0',
+        RESULTS_CACHE_SWR='0',
+        HTTP_CACHE='0',
+        # Measure the server, not the scraper pacing
+        EMAG_RATE='1000',
+        EMAG_MAX_RATE='1000',
+        LISTAFIRME_RATE='1000',
+        LISTAFIRME_MAX_RATE='1000',
+        PYTHONUNBUFFERED='1',
+    )
+    log = open(os.path.join(state_dir, f'server-{workers}.log'), 'w')
+
+    if have_gunicorn():
+        cmds = [['gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                 '--workers', str(workers), '--threads', str(threads), 'wsgi:app']]
+    else:
+        cmds = [[sys.executable, os.path.abspath(__file__), '--serve', str(port)]] * workers
+
+    procs = [subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT) for cmd in cmds]
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if any(p.poll() is not None for p in procs):
+            stop_api(procs)
+            raise RuntimeError(f"API exited early, see {log.name}")
+        try:
+            urllib.request.urlopen(url + '/api/health', timeout=1).read()
+            time.sleep(1)  # let the other workers finish importing
+            return procs, url
+        except Exception:
+            time.sleep(0.2)
+    stop_api(procs)
+    raise RuntimeError(f"API did not start, see {log.name}")
+
+
+def stop_api(procs):
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def serve_worker(port):
+    """One threaded werkzeug worker; the kernel spreads connections over all of them."""
+    import socket
+    from werkzeug.serving import make_server
+    from wsgi import app
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(('127.0.0.1', port))
+    sock.listen(128)
+    make_server('127.0.0.1', port, app, threaded=True, fd=sock.fileno()).serve_forever()
+
+
+# =====================================================
+# CLIENT
+# =====================================================
+
+def one_search(url, prompt, poll_interval=0.05, timeout=120):
+    """Queues a search, polls its job until it finishes: (seconds, product count or None)."""
+    body = json.dumps({'prompt': prompt}).encode('utf-8')
+    req = urllib.request.Request(
+        url + '/api/search',
+        data=body,
+        headers={'Content-Type': 'application/json', 'X-Session-ID': uuid.uuid4().hex},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=30) as r:
+        status_url = url + json.loads(r.read())['statusUrl']
+
+    while time.perf_counter() - start < timeout:
+        with urllib.request.urlopen(status_url, timeout=30) as r:
+            job = json.loads(r.read())
+        if job['status'] == 'done':
+            return time.perf_counter() - start, job.get('count', 0)
+        if job['status'] == 'error':
+            return time.perf_counter() - start, None
+        time.sleep(poll_interval)
+    return time.perf_counter() - start, None
+
+
+def run_load(url, clients, total):
+    latencies, failures, products = [], 0, 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        futures = [pool.submit(one_search, url, PROMPTS[i % len(PROMPTS)]) for i in range(total)]
+        for f in futures:
+            try:
+                elapsed, count = f.result()
+            except Exception:
+                failures += 1
+                continue
+            if count is None:
+                failures += 1
+            else:
+                latencies.append(elapsed)
+                products += count
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / wall,
+        'p50': statistics.median(latencies) if latencies else 0,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+        'failures': failures,
+        'products': products / max(len(latencies), 1),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client connections')
+    parser.add_argument('--requests', type=int, default=64, help='searches per worker count')
+    parser.add_argument('--latency', type=float, default=0.02, help='fake site latency per page (s)')
+    parser.add_argument('--cards', type=int, default=60, help='products on the first listing page')
+    parser.add_argument('--vendors', type=int, default=20, help='distinct vendors on the fake site')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_worker(args.serve)
+        sys.exit(0)
+
+    fake = start_fake_site(args.latency, args.cards, args.vendors)
+    fake_url = f'http://127.0.0.1:{fake.server_address[1]}'
+    server_kind = 'gunicorn gthread' if have_gunicorn() else 'werkzeug workers (SO_REUSEPORT)'
+
+    print(f"Fake site {fake_url}, {args.latency * 1000:.0f} ms/page; server: {server_kind}")
+    print(f"{args.requests} searches per run, {args.clients} concurrent clients\n")
+    print(f"{'workers':>7}{'req/s':>9}{'p50 s':>8}{'p95 s':>8}{'failed':>8}{'products':>10}{'scaling':>9}")
+
+    baseline = None
+    for workers in args.workers:
+        state_dir = tempfile.mkdtemp(prefix='loadtest-')
+        procs, url = start_api(workers, args.threads, args.port, fake_url, state_dir)
+        try:
+            one_search(url, PROMPTS[0])  # warm-up: imports, catalog, lexicon
+            res = run_load(url, args.clients, args.requests)
+        finally:
+            stop_api(procs)
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+        baseline = baseline or res['rps']
+        print(f"{workers:>7}{res['rps']:>9.2f}{res['p50']:>8.2f}{res['p95']:>8.2f}"
+              f"{res['failures']:>8}{res['products']:>10.1f}{res['rps'] / baseline:>8.2f}x")
+
+    fake.shutdown()
@@ -0,0 +1,288 @@
+import asyncio
+import os
+
+from scraper import (
+    EMAG_HEADERS,
+    LISTAFIRME_HEADERS,
+    listing_page_url,
+    parse_product_cards,
+    parse_vendor_link,
+    parse_vendor_identity,
+    create_company_site_url,
+    parse_company_facts,
+    is_company_page,
+)
+from cache_store import product_cache, product_key
+from company_store import company_store
+from scoring import score_company
+from resilience import TransientError, is_transient_status
+
+
+# =====================================================
+# LISTING STAGE
+# =====================================================
+
+# Listing pages fetched at the same time; eMAG serves 60 cards per full page
+LISTING_CONCURRENCY = int(os.getenv('LISTING_CONCURRENCY', 4))
+FULL_PAGE_SIZE = 60
+
+
+async def _fetch_listing_page(fetcher, base_url, page):
+    target_url = listing_page_url(base_url, page)
+    print("Scraping:", target_url)
+
+    status, html = await fetcher.fetch(target_url, headers=EMAG_HEADERS)
+    if status == 404:
+        return page, None
+    if is_transient_status(status):
+        # Without the first page there is nothing to show (or to cache)
+        if page == 1:
+            raise TransientError(f"eMAG unavailable (status {status})")
+        print(f"Listing page {page} unavailable (status {status}), stopping there")
+        return page, []
+    if html is None:
+        return page, []
+    return page, parse_product_cards(html)
+
+
+async def iter_listing(fetcher, base_url, max_pages=2, concurrency=LISTING_CONCURRENCY):
+    """
+    Yields the product cards of each listing page, in page order, as soon
+    as it and every page before it have arrived.
+
+    Up to `concurrency` pages are in flight at once. A 404 or a short page
+    marks the end of the listing: higher pages still in flight are
+    cancelled and never started, and pages past it are never yielded.
+    """
+    last_page = max_pages
+    next_page = 1
+    next_yield = 1
+    arrived = {}    # page number -> products, waiting for lower pages
+    in_flight = {}  # task -> page number
+
+    try:
+        while True:
+            while next_page <= last_page and len(in_flight) < concurrency:
+                task = asyncio.ensure_future(_fetch_listing_page(fetcher, base_url, next_page))
+                in_flight[task] = next_page
+                next_page += 1
+
+            if not in_flight:
+                break
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+
+            # Lower pages first; the end marker only ever moves down
+            for page, task in sorted((in_flight.pop(task), task) for task in done):
+                if page > last_page:
+                    continue
+
+                _, products = task.result()
+                if products is None:
+                    last_page = min(last_page, page - 1)
+                elif len(products) < FULL_PAGE_SIZE:
+                    last_page = min(last_page, page)
+                arrived[page] = products
+
+            # A page is only final once every lower page has arrived
+            while next_yield <= last_page and next_yield in arrived:
+                products = arrived.pop(next_yield)
+                if products:
+                    yield products
+                next_yield += 1
+
+            # Past the end of the listing: drop pages we no longer need
+            for task, page in list(in_flight.items()):
+                if page > last_page:
+                    task.cancel()
+                    del in_flight[task]
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+async def scrape_listing(fetcher, base_url, max_pages=2):
+    """Extracts product URL, name, image and price from eMAG listing pages."""
+    all_products = []
+    async for products in iter_listing(fetcher, base_url, max_pages):
+        all_products.extend(products)
+    return all_products
+
+
+def unique_products(products):
+    seen = set()
+    unique = []
+    for p in products:
+        if p['url'] not in seen:
+            seen.add(p['url'])
+            unique.append(p)
+    return unique
+
+
+# =====================================================
+# STAGED VENDOR PIPELINE
+# =====================================================
+
+class VendorPipeline:
+    """
+    Per-search vendor validation split into three deduplicated stages:
+
+      1. product URL  -> vendor page URL   (one fetch per product)
+      2. vendor page  -> (name, CUI)       (one fetch per unique vendor)
+      3. CUI          -> company facts     (one fetch per unique company,
+                                            stored in company_store) -> score
+
+    Stages 2 and 3 keep one task per key, so concurrent products from the
+    same vendor await the same in-flight fetch. Create one instance per
+    search; all coroutines run on the fetcher's event loop.
+    """
+
+    def __init__(self, fetcher, companies=company_store, products_cache=product_cache):
+        self.fetcher = fetcher
+        self.companies = companies
+        self.products_cache = products_cache
+        self._vendors = {}
+        self._companies = {}
+
+    def _once(self, tasks, key, coro_fn, *args):
+        task = tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn(*args))
+            tasks[key] = task
+        return task
+
+    async def _vendor_page(self, url):
+        html = await self.fetcher.get_text(url, headers=EMAG_HEADERS)
+        return parse_vendor_link(html, url) if html else None
+
+    async def _resolve_vendor(self, vendor_page):
+        html = await self.fetcher.get_text(vendor_page, headers=EMAG_HEADERS)
+        return parse_vendor_identity(html) if html else (None, None)
+
+    def _company_facts(self, name, code, status, html):
+        """
+        Facts to store for a fetched listafirme.ro page. "No balance sheet"
+        (None) is only stored for a 404 or a real company page without one;
+        anything else (403 anti-bot, captcha, unknown markup) is not a
+        verdict and raises TransientError, so nothing is stored.
+        """
+        if status == 404:
+            return None
+        if status >= 400:
+            raise TransientError(f"listafirme.ro answered {status} for {name}")
+
+        facts = parse_company_facts(html)
+        if facts is None and not is_company_page(html, code):
+            raise TransientError(f"listafirme.ro page for {name} is not a company page (blocked?)")
+        return facts
+
+    async def _resolve_company(self, name, code):
+        facts = self.companies.get(code)
+        if facts is None:
+            url = create_company_site_url(name, code)
+            # Only pages about this company go into the HTTP cache: a block
+            # page served with a 200 must not be replayed for weeks
+            status, html = await self.fetcher.fetch(
+                url, headers=LISTAFIRME_HEADERS, cacheable=lambda text: is_company_page(text, code)
+            )
+            if is_transient_status(status):
+                # No verdict: a timeout or an outage must not be stored as "no data"
+                raise TransientError(f"listafirme.ro unavailable for {name} (status {status})")
+
+            try:
+                parsed = self._company_facts(name, code, status, html)
+            except TransientError:
+                # A rejected page may still be cached (e.g. stored before this check)
+                await self.fetcher.forget(url)
+                raise
+            facts = self.companies.put(code, name, parsed)
+
+        return score_company(facts)
+
+    async def process_url(self, product):
+        url = product['url']
+
+        try:
+            # Stage 1: product -> vendor page (skipped for known products)
+            known = self.products_cache.get(product_key(url))
+            if known is not None:
+                name, code = known['name'], known['cui']
+            else:
+                vendor_page = await self._vendor_page(url)
+                if not vendor_page:
+                    return None
+
+                # Stage 2: unique vendor page -> (name, CUI)
+                name, code = await self._once(self._vendors, vendor_page, self._resolve_vendor, vendor_page)
+                if not name or not code:
+                    return None
+
+                self.products_cache.set(product_key(url), {
+                    'vendor_page': vendor_page,
+                    'name': name,
+                    'cui': code
+                })
+
+            # Stage 3: unique CUI -> financials / credibility
+            res = await self._once(self._companies, code, self._resolve_company, name, code)
+            return url, name, res['is_valid'], res['score'], product
+
+        except TransientError as e:
+            print(f"Skipped {url} (retry on a later search): {e}")
+            return None
+        except Exception as e:
+            print(f"Error processing {url}: {e}")
+            return None
+
+    async def process_all(self, products):
+        """Yields one result (or None) per product, in completion order."""
+        for next_done in asyncio.as_completed([self.process_url(p) for p in products]):
+            yield await next_done
+
+    async def process_stream(self, batches):
+        """
+        Like process_all, but takes an async iterator of product batches
+        (e.g. iter_listing) and starts vendor checks for each batch as soon
+        as it arrives instead of waiting for pagination to finish.
+        """
+        results = asyncio.Queue()
+        done = object()
+        seen = set()
+        tasks = []
+
+        async def run_one(product):
+            await results.put(await self.process_url(product))
+
+        async def feed():
+            try:
+                async for batch in batches:
+                    for p in batch:
+                        if p['url'] not in seen:
+                            seen.add(p['url'])
+                            tasks.append(asyncio.ensure_future(run_one(p)))
+                await asyncio.gather(*tasks)
+            finally:
+                await results.put(done)
+
+        feeder = asyncio.ensure_future(feed())
+        try:
+            while True:
+                res = await results.get()
+                if res is done:
+                    break
+                yield res
+            await feeder
+        finally:
+            feeder.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def check_all(self, products):
+        return [res async for res in self.process_all(products) if res]
+
+    def stream_listing(self, base_url, max_pages=2):
+        """Listing pages and vendor checks overlapped; yields results as they finish."""
+        return self.process_stream(iter_listing(self.fetcher, base_url, max_pages))
+
+    async def check_listing(self, base_url, max_pages=2):
+        return [res async for res in self.stream_listing(base_url, max_pages) if res]
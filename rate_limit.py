@@ -0,0 +1,256 @@
+import asyncio
+import os
+import threading
+import time
+
+
+# =====================================================
+# PER-HOST RATE LIMITING + ADAPTIVE CONCURRENCY
+# =====================================================
+#
+# Every fetch to a scraped host goes through that host's HostLimiter:
+#
+#   - a token bucket paces requests to `rate` per second (bursts up to
+#     `burst`);
+#   - an AIMD controller sizes the number of requests in flight and the
+#     bucket rate: additive increase while responses are healthy,
+#     multiplicative decrease on 429/503, network errors and latency
+#     spikes.
+#
+# Both start from a conservative guess and converge on what the host
+# tolerates. Retry-After on a 429/503 pauses the host's bucket. Limiters
+# are per process: with several gunicorn workers, size the rates per worker.
+
+# (start rate, max rate) in requests per second
+HOST_RATES = {
+    'www.emag.ro': (float(os.getenv('EMAG_RATE', 10)), float(os.getenv('EMAG_MAX_RATE', 50))),
+    'listafirme.ro': (float(os.getenv('LISTAFIRME_RATE', 4)), float(os.getenv('LISTAFIRME_MAX_RATE', 20))),
+}
+
+# Lowest rate a host is ever backed off to
+MIN_RATE = 0.5
+
+# Rate added per round of `limit` healthy responses, after the first back-off
+RATE_STEP = float(os.getenv('RATE_STEP', 1.0))
+
+# On congestion: limit and rate are multiplied by these
+CONCURRENCY_BACKOFF = 0.5
+RATE_BACKOFF = 0.7
+
+# A response this many times slower than the host's usual latency is a
+# spike (ignored below LATENCY_SPIKE_FLOOR seconds, to not react to noise)
+LATENCY_SPIKE = 3.0
+LATENCY_SPIKE_FLOOR = 1.0
+
+# Requests already in flight fail together; back off at most once per window
+DECREASE_COOLDOWN = 1.0
+
+# Longest Retry-After we honour, in seconds
+MAX_RETRY_AFTER = 60.0
+
+CONGESTION_STATUSES = (429, 503)
+
+# Bucket size as a fraction of one second's worth of requests
+BURST = 0.25
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `reserve` takes a token right away (going
+    into debt if needed) and returns how long the caller must wait, so the
+    same bucket paces both async and blocking callers.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.burst = max(1.0, rate * BURST)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.burst = max(1.0, rate * BURST)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AIMDController:
+    """Concurrency limit and request rate driven by response feedback."""
+
+    def __init__(self, limit, max_limit, rate, max_rate):
+        self.limit = float(limit)
+        self.max_limit = max_limit
+        self.rate = rate
+        self.max_rate = max_rate
+        self.latency = None       # EWMA of healthy response times
+        self.slow_start = True    # grow fast until the first back-off
+        self.backoffs = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def on_success(self, latency):
+        with self._lock:
+            if self.latency is not None and latency > max(self.latency * LATENCY_SPIKE, LATENCY_SPIKE_FLOOR):
+                return self._decrease()
+
+            self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+            if self.slow_start:
+                self.limit = min(self.max_limit, self.limit + 1)
+                self.rate = min(self.max_rate, self.rate + 0.5)
+            else:
+                # +1 in flight and +RATE_STEP req/s per `limit` responses
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + RATE_STEP / self.limit)
+            return False
+
+    def on_congestion(self):
+        with self._lock:
+            return self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN:
+            return False
+        self._last_decrease = now
+        self.slow_start = False
+        self.backoffs += 1
+        self.limit = max(1.0, self.limit * CONCURRENCY_BACKOFF)
+        self.rate = max(MIN_RATE, self.rate * RATE_BACKOFF)
+        return True
+
+
+def parse_retry_after(value):
+    try:
+        return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    Rate limit and adaptive concurrency for one host.
+
+    Async callers (the fetch engine) use `async with limiter.slot()` and
+    report the outcome with `record`; blocking callers only take a token
+    with `wait` (they are bounded by their own thread count).
+    """
+
+    def __init__(self, host, rate, max_rate, max_concurrency):
+        self.host = host
+        self.bucket = TokenBucket(rate)
+        self.aimd = AIMDController(max(1, max_concurrency // 2), max_concurrency, rate, max_rate)
+        self.in_flight = 0
+        self._cond = None  # asyncio.Condition, created on the engine loop
+
+    # ---------- admission ----------
+
+    async def acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.aimd.limit))
+            self.in_flight += 1
+        delay = self.bucket.reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled while paced: the slot was never handed out
+                await self.release()
+                raise
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def slot(self):
+        return _Slot(self)
+
+    def wait(self):
+        delay = self.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    # ---------- feedback ----------
+
+    def record(self, status, latency, retry_after=None):
+        """
+        Feeds one response back: status None means a network error or
+        timeout. Returns True when the host was backed off.
+        """
+        if status is None or status in CONGESTION_STATUSES:
+            pause = parse_retry_after(retry_after)
+            if pause:
+                self.bucket.pause(pause)
+            backed_off = self.aimd.on_congestion()
+        else:
+            backed_off = self.aimd.on_success(latency)
+
+        if backed_off:
+            print(f"[RATE] {self.host}: backing off to {int(self.aimd.limit)} in flight, "
+                  f"{self.aimd.rate:.1f} req/s (status {status}, {latency:.2f}s)")
+        if self.bucket.rate != self.aimd.rate:
+            self.bucket.set_rate(self.aimd.rate)
+        return backed_off
+
+    def stats(self):
+        return {
+            'inFlight': self.in_flight,
+            'limit': int(self.aimd.limit),
+            'rate': round(self.aimd.rate, 2),
+            'latency': round(self.aimd.latency, 3) if self.aimd.latency is not None else None,
+            'backoffs': self.aimd.backoffs,
+        }
+
+
+class _Slot:
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        return self.limiter
+
+    async def __aexit__(self, *exc):
+        await self.limiter.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(host, max_concurrency):
+    """The shared limiter of a scraped host, or None for hosts we don't pace."""
+    if host not in HOST_RATES:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, max_rate = HOST_RATES[host]
+            limiter = HostLimiter(host, rate, max_rate, max_concurrency)
+            _limiters[host] = limiter
+        return limiter
+
+
+def stats():
+    with _limiters_lock:
+        return {host: limiter.stats() for host, limiter in _limiters.items()}
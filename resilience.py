@@ -0,0 +1,214 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+
+# =====================================================
+# RETRIES + CIRCUIT BREAKERS
+# =====================================================
+#
+# Shared by the scrapers (eMAG, listafirme.ro) and the Gemini calls:
+#
+#   - transient failures (timeouts, connection errors, 429, 5xx) are
+#     retried a bounded number of times with full-jitter exponential
+#     backoff; permanent ones (404, bad input, unparsable pages) are not;
+#   - each dependency has a circuit breaker: after BREAKER_FAILURES
+#     transient failures in a row (429s don't count: the host is up, it
+#     wants us to slow down, which rate_limit takes care of) it opens and calls fail fast with
+#     CircuitOpen for BREAKER_RESET seconds, then a single probe call
+#     decides whether it closes again.
+#
+# A transient failure is never a verdict: callers must not cache it.
+
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', 3))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 0.5))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 8))
+
+# Gemini quotas are per minute, so its retries wait longer
+LLM_RETRY_ATTEMPTS = int(os.getenv('LLM_RETRY_ATTEMPTS', 4))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 2))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 30))
+
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.getenv('BREAKER_RESET', 30))
+
+TRANSIENT_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+# Substrings of error messages/class names that mean "try again later"
+TRANSIENT_ERROR_MARKERS = (
+    '429', 'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded',
+    'InternalServerError', 'Timeout', 'timed out', 'Connection', 'temporarily',
+)
+
+
+class TransientError(Exception):
+    """A dependency failed in a way that may succeed on a later attempt."""
+
+
+class RateLimited(TransientError):
+    """429 / quota exhausted: retry later, but the dependency is up."""
+
+
+class CircuitOpen(TransientError):
+    """The dependency's circuit breaker is open; the call was not made."""
+
+
+def is_transient_status(status):
+    """None (network error / timeout) or a retryable HTTP status."""
+    return status is None or status in TRANSIENT_STATUSES
+
+
+def is_transient_error(exc):
+    if isinstance(exc, (TransientError, TimeoutError, ConnectionError)):
+        return True
+    text = f"{type(exc).__name__} {exc}"
+    return any(marker in text for marker in TRANSIENT_ERROR_MARKERS)
+
+
+def is_rate_limited(exc):
+    if isinstance(exc, RateLimited):
+        return True
+    text = f"{type(exc).__name__} {exc}"
+    return '429' in text or 'ResourceExhausted' in text
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """closed -> (N failures) -> open -> (reset timeout) -> half-open -> closed/open"""
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_timeout=BREAKER_RESET):
+        self.name = name
+        self.max_failures = failures
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probe_started = None  # a lost probe (e.g. cancelled) expires after reset_timeout
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self):
+        """Raises CircuitOpen unless a call may go through now."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return
+            now = time.monotonic()
+            if state == 'half-open' and (self._probe_started is None
+                                         or now - self._probe_started >= self.reset_timeout):
+                self._probe_started = now
+                return
+        raise CircuitOpen(f"{self.name} is unavailable (circuit open)")
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print(f"[BREAKER] {self.name}: closed")
+            self.failures = 0
+            self.opened_at = None
+            self._probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            probe_failed = self._probe_started is not None
+            if probe_failed or (self.opened_at is None and self.failures >= self.max_failures):
+                if self.opened_at is None:
+                    self.trips += 1
+                print(f"[BREAKER] {self.name}: open for {self.reset_timeout:.0f}s after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._probe_started = None
+
+    def stats(self):
+        return {'state': self.state, 'failures': self.failures, 'trips': self.trips}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(name):
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def stats():
+    with _breakers_lock:
+        return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+# ---------- retry loops ----------
+
+def call_with_retry(fn, breaker, attempts=RETRY_ATTEMPTS, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY,
+                    is_transient=is_transient_error):
+    """
+    Calls fn() until it succeeds, fails permanently or `attempts` run out.
+    Permanent errors are re-raised as-is (and don't count against the
+    breaker); exhausted transient ones are raised as TransientError.
+    """
+    for attempt in range(attempts):
+        breaker.allow()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_transient(e):
+                breaker.record_success()
+                raise
+            if not is_rate_limited(e):
+                breaker.record_failure()
+            if attempt == attempts - 1:
+                raise TransientError(f"{breaker.name}: {e}") from e
+            delay = backoff_delay(attempt, base, cap)
+            print(f"[RETRY] {breaker.name}: {e} - retrying in {delay:.1f}s ({attempt + 1}/{attempts})")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+async def fetch_with_retry(fetch_once, breaker, attempts=RETRY_ATTEMPTS, base=RETRY_BASE_DELAY,
+                           cap=RETRY_MAX_DELAY):
+    """
+    Async HTTP variant: fetch_once() returns (status, text, headers).
+    Transient statuses are retried (waiting at least Retry-After); the last
+    response is returned either way, and an open breaker gives
+    (None, None, None) without fetching.
+    """
+    status, text, headers = None, None, None
+    for attempt in range(attempts):
+        try:
+            breaker.allow()
+        except CircuitOpen:
+            return None, None, None
+
+        status, text, headers = await fetch_once()
+        if not is_transient_status(status):
+            breaker.record_success()
+            return status, text, headers
+
+        if status != 429:
+            breaker.record_failure()
+        if attempt < attempts - 1:
+            delay = backoff_delay(attempt, base, cap)
+            try:
+                delay = max(delay, min(cap, float(headers.get('Retry-After'))))
+            except (AttributeError, TypeError, ValueError):
+                pass
+            await asyncio.sleep(delay)
+    return status, text, headers
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+
+# =====================================================
+# COMPANY SCORING (pure functions over stored facts)
+# =====================================================
+#
+# A company's facts come from its listafirme.ro balance sheet (see
+# company_store):
+#
+#     {"cui", "name", "turnover", "profit", "debts", "assets",
+#      "employees", "founded", "fetched"}
+#
+# The numeric fields are None when listafirme.ro had no balance sheet.
+# Nothing here touches the network or the store, so changing a threshold
+# or the formula only means re-running score_company over stored facts.
+
+# A vendor counts as a small business below all of these
+SMALL_BUSINESS_LIMITS = {
+    'max_turnover': 50_000_000,
+    'max_assets': 50_000_000,
+    'max_employees': 50,   # exclusive
+}
+
+INVALID = {'is_valid': False, 'score': 0}
+
+
+def check_small_business(cifra, active, nr, limits=SMALL_BUSINESS_LIMITS):
+    return cifra <= limits['max_turnover'] and active <= limits['max_assets'] and nr < limits['max_employees']
+
+
+def compute_credibility(profit, datorii, age):
+    try:
+        f = profit / (profit + (abs(datorii)**0.5)) if profit + abs(datorii)**0.5 != 0 else 0
+        a = age / (age + 3)
+        return int((0.8*f + 0.2*a)*100)
+    except:
+        return 0
+
+
+def company_age(facts):
+    """Years between the first balance sheet and the year the facts were fetched."""
+    return datetime.fromtimestamp(facts['fetched']).year - facts['founded']
+
+
+def has_financials(facts):
+    return facts is not None and facts.get('turnover') is not None
+
+
+def score_company(facts, limits=SMALL_BUSINESS_LIMITS):
+    """{'is_valid', 'score'} for one company's facts (None -> invalid)."""
+    if not has_financials(facts):
+        return dict(INVALID)
+    if not check_small_business(facts['turnover'], facts['assets'], facts['employees'], limits):
+        return dict(INVALID)
+    return {'is_valid': True, 'score': compute_credibility(facts['profit'], facts['debts'], company_age(facts))}
+
+
+def score_all(companies, limits=SMALL_BUSINESS_LIMITS):
+    """CUI -> verdict for a list of facts (e.g. company_store.all())."""
+    return {facts['cui']: score_company(facts, limits) for facts in companies}
@@ -0,0 +1,377 @@
+from bs4 import BeautifulSoup, SoupStrainer
+import soupsieve as sv
+from urllib.parse import urljoin
+import html as html_lib
+import os
+import re
+
+# Fastest BeautifulSoup tree builder available; html.parser ships with
+# Python, lxml is several times faster when installed.
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+HTML_PARSER = os.getenv('SCRAPER_HTML_PARSER', HTML_PARSER)
+
+
+EMAG_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+}
+
+LISTAFIRME_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+# ===================================================================
+# SCRAPING + COMPANY VALIDATION CODE
+#
+# Each scraper is a pure `parse_*` function working on HTML text; the
+# async engine (pipeline.py) fetches the pages and feeds them in.
+#
+# Pages are multi-hundred-KB but we only read a few elements, so the
+# parsers avoid building a full tree: vendor pages are scanned with
+# regexes, listing pages keep only the product cards and listafirme.ro
+# pages only the balance-sheet fragment. Each falls back to a full parse
+# when the fast path doesn't recognise the markup.
+# ===================================================================
+
+def make_soup(html, parse_only=None):
+    return BeautifulSoup(html, HTML_PARSER, parse_only=parse_only)
+
+
+# Only product card subtrees are built from listing pages
+CARD_CLASS_RE = re.compile(r'(^|\s)card-(item|v2)(\s|$)')
+CARD_STRAINER = SoupStrainer(['div', 'section'], class_=CARD_CLASS_RE)
+
+def listing_page_url(base_url, page):
+    """Paginated eMAG listing URL: page 1 is the base URL itself."""
+    if page == 1:
+        return base_url
+    if base_url.endswith('/c'):
+        return base_url[:-2] + f'/p{page}/c'
+    return f"{base_url}/p{page}/c"
+
+
+# ==========================================
+# LISTING CARD PARSING PLAN
+#
+# Selectors are compiled once at import. For each page we pick, from the
+# first few cards, the name/price selector that matches this layout and
+# use only that one; the full selector chain runs only for cards where
+# the page's plan finds nothing (mixed A/B layouts).
+# ==========================================
+
+NAME_SELECTORS = [sv.compile(sel) for sel in (
+    "a.card-v2-title",
+    "h2.card-v2-title a",
+    "a[data-zone='title']",
+    "a.js-product-url",
+    "h2 a",
+    "a.product-title",
+    ".card-body a.card-v2-title",
+)]
+
+PRICE_SELECTORS = [sv.compile(sel) for sel in (
+    ".product-new-price",
+    ".card-v2-price .product-new-price",
+    "p.product-new-price",
+    "span.product-new-price",
+    ".price-overview .product-new-price",
+)]
+
+PRICE_JUNK_RE = re.compile(r"[^\d.,]")
+PRICE_NUMBER_RE = re.compile(r"\d+\.?\d*")
+
+PLAN_SAMPLE_CARDS = 3
+
+
+def _card_name(card, selectors):
+    for selector in selectors:
+        elem = selector.select_one(card)
+        if elem:
+            txt = elem.get_text(strip=True)
+            if txt:
+                return txt
+    return None
+
+
+def _card_price(card, selectors):
+    for selector in selectors:
+        elem = selector.select_one(card)
+        if elem:
+            cleaned = PRICE_JUNK_RE.sub("", elem.get_text(strip=True))
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+            match = PRICE_NUMBER_RE.search(cleaned)
+
+            if match:
+                try:
+                    return float(match.group())
+                except ValueError:
+                    pass
+    return None
+
+
+def detect_card_plan(cards):
+    """
+    Returns (name_selectors, price_selectors) for this page: the first
+    selector of each chain that works on the sample cards, or the whole
+    chain when none does.
+    """
+    sample = cards[:PLAN_SAMPLE_CARDS]
+
+    name_plan = next(
+        ([sel] for sel in NAME_SELECTORS if any(_card_name(c, [sel]) for c in sample)),
+        NAME_SELECTORS
+    )
+    price_plan = next(
+        ([sel] for sel in PRICE_SELECTORS if any(_card_price(c, [sel]) is not None for c in sample)),
+        PRICE_SELECTORS
+    )
+    return name_plan, price_plan
+
+
+def parse_card(card, plan):
+    name_plan, price_plan = plan
+    product = {}
+
+    # ==========================================
+    # PRODUCT URL
+    # ==========================================
+    url = card.get("data-url")
+
+    if not url:
+        a_tag = card.find("a", href=True)
+        if a_tag:
+            url = a_tag["href"]
+
+    if not url:
+        return None
+
+    if url.startswith("/"):
+        url = "https://www.emag.ro" + url
+    elif not url.startswith("http"):
+        url = "https://www.emag.ro/" + url
+
+    product["url"] = url
+
+    # ==========================================
+    # PRODUCT NAME
+    # ==========================================
+    name = _card_name(card, name_plan)
+    if not name and name_plan is not NAME_SELECTORS:
+        name = _card_name(card, NAME_SELECTORS)
+
+    # Fallback: any <a> with meaningful text
+    if not name:
+        for a in card.find_all("a"):
+            txt = a.get_text(strip=True)
+            if txt and len(txt) > 4:
+                name = txt
+                break
+
+    product["name"] = name or "Unknown Product"
+
+    # ==========================================
+    # PRODUCT IMAGE
+    # ==========================================
+    img_elem = card.find("img")
+    img_src = None
+
+    if img_elem:
+        img_src = img_elem.get("data-src") or img_elem.get("src")
+
+    if img_src:
+        if img_src.startswith("//"):
+            img_src = "https:" + img_src
+        elif img_src.startswith("/"):
+            img_src = "https://www.emag.ro" + img_src
+
+    product["image"] = img_src
+
+    # ==========================================
+    # PRODUCT PRICE
+    # ==========================================
+    price_val = _card_price(card, price_plan)
+    if price_val is None and price_plan is not PRICE_SELECTORS:
+        price_val = _card_price(card, PRICE_SELECTORS)
+
+    product["price"] = price_val
+
+    return product
+
+
+def parse_product_cards(html):
+    """
+    Extracts product URL, name, image and price from one eMAG listing page.
+    Robust version compatible with NEW (2024–2025) layout.
+    """
+    soup = make_soup(html, parse_only=CARD_STRAINER)
+
+    # The strainer keeps only card subtrees (div.card-item, div.card-v2,
+    # section.card-v2), so the top-level tags are the outermost cards.
+    cards = soup.find_all(['div', 'section'], recursive=False)
+    if not cards:
+        cards = soup.find_all(['div', 'section'], class_=CARD_CLASS_RE)
+
+    plan = detect_card_plan(cards)
+
+    products = []
+    for card in cards:
+        product = parse_card(card, plan)
+        if product:
+            products.append(product)
+
+    return products
+
+
+VENDOR_LINK_MARKER = 'v?ref=see_vendor_page'
+VENDOR_LINK_RE = re.compile(r'<a\b[^>]*?\bhref\s*=\s*(["\'])([^"\']*v\?ref=see_vendor_page[^"\']*)\1', re.I)
+
+
+def parse_vendor_link(html, url):
+    if VENDOR_LINK_MARKER not in html:
+        return None
+
+    m = VENDOR_LINK_RE.search(html)
+    if m:
+        return urljoin(url, html_lib.unescape(m.group(2)))
+
+    soup = make_soup(html)
+    v = soup.select_one('a[href*="v?ref=see_vendor_page"]')
+    if not v:
+        return None
+    return urljoin(url, v.get('href'))
+
+
+VENDOR_NAME_LABEL = "Denumirea companiei:"
+VENDOR_CODE_LABEL = "Cod unic de inregistrare:"
+
+
+def _label_value(html, label):
+    """Text right after <strong>label</strong>, the way soup.next_sibling reads it."""
+    m = re.search(r'<strong[^>]*>' + re.escape(label) + r'</strong>([^<]*)', html)
+    return html_lib.unescape(m.group(1)).strip() if m else None
+
+
+def parse_vendor_identity(html):
+    if VENDOR_NAME_LABEL not in html or VENDOR_CODE_LABEL not in html:
+        return None, None
+
+    name, code = _label_value(html, VENDOR_NAME_LABEL), _label_value(html, VENDOR_CODE_LABEL)
+    if name and code:
+        return name, code
+
+    soup = make_soup(html)
+    n = soup.find('strong', string=VENDOR_NAME_LABEL)
+    c = soup.find('strong', string=VENDOR_CODE_LABEL)
+    if n and c:
+        return n.next_sibling.strip(), c.next_sibling.strip()
+    return None, None
+
+
+def create_company_site_url(name, code):
+    slug = re.sub(r'[^a-z0-9]+', '-', name.lower().strip()) + f"-{code}"
+    return f"https://listafirme.ro/{slug}/"
+
+
+def is_company_page(html, code):
+    """
+    True for a listafirme.ro page about the company with this CUI (its
+    CUI appears on it). Block, captcha and error pages served with a 200
+    don't mention it.
+    """
+    digits = clean_num(str(code))
+    return bool(digits) and re.search(r'(?<!\d)' + digits + r'(?!\d)', html) is not None
+
+
+def clean_num(t):
+    return re.sub(r'\D', '', t)
+
+
+BILANT_ID_RE = re.compile(r'id\s*=\s*["\']bilant["\']')
+
+
+def bilant_fragment(html):
+    """
+    The markup from the `#bilant` div up to the end of its first table,
+    or the whole page if it can't be cut out cheaply.
+    """
+    m = BILANT_ID_RE.search(html)
+    if not m:
+        return html
+    start = html.rfind('<div', 0, m.start())
+    end = html.find('</table>', m.end())
+    if start == -1 or end == -1:
+        return html
+    return html[start:end + len('</table>')]
+
+
+def parse_company_facts(html):
+    """
+    Reads the listafirme.ro balance sheet ("bilanț") table. Returns the
+    latest year's figures and the year of the oldest balance sheet:
+    {turnover, profit, debts, assets, employees, founded}, or None.
+    """
+    try:
+        soup = make_soup(bilant_fragment(html))
+
+        # 1. Find the specific container for the balance sheet ("bilanț")
+        bilant_section = soup.find('div', id='bilant')
+
+        if not bilant_section:
+            return None
+
+        # 2. Find the table inside that section
+        table = bilant_section.find('table')
+        if not table:
+            return None
+
+        tbody = table.find('tbody')
+        rows = tbody.find_all('tr') if tbody else table.find_all('tr')
+
+        if len(rows) < 3:
+            return None
+
+        last_row = rows[-3]
+        last_row_cells = last_row.find_all('td')
+
+        if not last_row_cells:
+            return None
+
+        oldest_year = int(clean_num(last_row_cells[0].get_text(strip=True)))
+
+        first_row = rows[0]
+        cells = first_row.find_all('td')
+
+        if len(cells) >= 8:
+            active_imob = int(clean_num(cells[4].get_text()))
+            active_cir = int(clean_num(cells[5].get_text()))
+
+            return {
+                'turnover': int(clean_num(cells[1].get_text())),
+                'profit': int(clean_num(cells[2].get_text())),
+                'debts': int(clean_num(cells[3].get_text())),
+                'assets': active_imob + active_cir,
+                'employees': int(clean_num(cells[7].get_text())),
+                'founded': oldest_year,
+            }
+
+        return None
+
+    except Exception as e:
+        return None
+
+
+def parse_financials(html):
+    """
+    Legacy tuple form of parse_company_facts:
+    (cifra_afaceri, active, nr_salariati, profit, datorii, age) or None.
+    """
+    facts = parse_company_facts(html)
+    if facts is None:
+        return None
+    return (facts['turnover'], facts['assets'], facts['employees'],
+            facts['profit'], facts['debts'], 2025 - facts['founded'])
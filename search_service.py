@@ -0,0 +1,106 @@
+import os
+import threading
+
+from cache_store import results_cache, RESULTS_CACHE_FRESH
+from fetch_engine import engine
+from pipeline import VendorPipeline
+from url_builder import canonical_search_url
+
+
+# Serve stale entries and refresh them in the background (stale-while-revalidate)
+RESULTS_CACHE_SWR = os.getenv('RESULTS_CACHE_SWR', '1') != '0'
+
+
+# =====================================================
+# SEARCH (scrape + vendor check)
+# =====================================================
+
+def to_product_json(res):
+    url, company_name, is_valid, score, prod = res
+    return {
+        "url": url,
+        "productName": prod.get("name", "Unknown"),
+        "companyName": company_name,
+        "credibilityScore": score,
+        "imageUrl": prod.get("image", ""),
+        "price": prod.get("price", None)
+    }
+
+
+def sort_products(products):
+    products.sort(key=lambda x: x['credibilityScore'], reverse=True)
+    return products
+
+
+def store_results(search_url, products):
+    results_cache.set(canonical_search_url(search_url), products)
+
+
+def run_search(search_url):
+    """
+    Scrapes the listing and validates vendors (async engine, overlapped:
+    vendor checks start as each listing page arrives; each vendor page and
+    CUI is resolved once per search). Returns the sorted valid products and
+    stores them in the result cache.
+    """
+    pipeline = VendorPipeline(engine)
+    valid = [
+        to_product_json(res)
+        for res in engine.run(pipeline.check_listing(search_url))
+        if res[2]
+    ]
+    sort_products(valid)
+    store_results(search_url, valid)
+    return valid
+
+
+# =====================================================
+# RESULT CACHE (keyed by canonical search URL)
+# =====================================================
+
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def _refresh(key, search_url):
+    try:
+        run_search(search_url)
+        print("[RESULTS] Refreshed:", key)
+    except Exception as e:
+        print("[RESULTS] Background refresh failed:", key, e)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(key)
+
+
+def refresh_in_background(search_url):
+    """Re-runs a search in a daemon thread; at most one refresh per URL at a time."""
+    key = canonical_search_url(search_url)
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    threading.Thread(target=_refresh, args=(key, search_url), daemon=True).start()
+
+
+def cached_results(search_url):
+    """
+    Products cached for this search, or None. Stale entries are still
+    returned, and trigger a background refresh when SWR is enabled.
+    """
+    products, age = results_cache.get_with_age(canonical_search_url(search_url))
+    if products is None:
+        return None
+    if age >= RESULTS_CACHE_FRESH:
+        if not RESULTS_CACHE_SWR:
+            return None
+        refresh_in_background(search_url)
+    return products
+
+
+def search(search_url):
+    """(products, cached): cache hit served instantly, otherwise a full search."""
+    products = cached_results(search_url)
+    if products is not None:
+        return products, True
+    return run_search(search_url), False
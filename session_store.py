@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+from cache_store import open_sqlite, SQLiteConnections
+
+
+# =====================================================
+# CONVERSATION SESSIONS
+# =====================================================
+#
+# Conversation state ({"category": ..., "filters": [...]}) per client
+# session ID. Both stores expose the same three methods:
+#
+#     get(session_id) -> state or None
+#     set(session_id, state)
+#     delete(session_id)
+#
+# Sessions idle for longer than `idle_timeout` seconds are forgotten.
+
+# Used by the CLI and by clients that do not send a session ID
+DEFAULT_SESSION = "default"
+
+SESSION_IDLE_TIMEOUT = int(os.getenv('SESSION_IDLE_TIMEOUT', 2 * 3600))
+
+
+class MemorySessionStore:
+    """Per-process store; fine for a single worker."""
+
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, sweep_interval=60.0):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._sessions = {}  # session_id -> (state, last_used)
+        self._last_sweep = time.time()
+
+    def _sweep(self, now):
+        # Amortized eviction: at most one full scan per sweep_interval
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        for sid in [s for s, (_, used) in self._sessions.items() if now - used >= self.idle_timeout]:
+            del self._sessions[sid]
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            state, used = entry
+            if now - used >= self.idle_timeout:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (state, now)
+            return state
+
+    def set(self, session_id, state):
+        now = time.time()
+        with self._lock:
+            self._sweep(now)
+            self._sessions[session_id] = (state, now)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    Store shared by every worker process on the host (gunicorn with
+    several workers). WAL mode lets readers run while one worker writes;
+    each thread keeps its own connection.
+    """
+
+    def __init__(self, path, idle_timeout=SESSION_IDLE_TIMEOUT, sweep_interval=60.0):
+        self.path = path
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._connections = SQLiteConnections(path)
+        self._last_sweep = 0.0
+
+        conn = open_sqlite(path)
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY, state TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions(last_used)")
+        conn.close()
+
+    def _conn(self):
+        return self._connections.get()
+
+    def _sweep(self, conn, now):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        conn.execute("DELETE FROM sessions WHERE last_used < ?", (now - self.idle_timeout,))
+
+    def get(self, session_id):
+        now = time.time()
+        with self._conn() as conn:
+            self._sweep(conn, now)
+            row = conn.execute(
+                "SELECT state FROM sessions WHERE id = ? AND last_used >= ?",
+                (session_id, now - self.idle_timeout),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE sessions SET last_used = ? WHERE id = ?", (now, session_id))
+            return json.loads(row[0])
+
+    def set(self, session_id, state):
+        now = time.time()
+        with self._conn() as conn:
+            self._sweep(conn, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, last_used) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state, ensure_ascii=False), now),
+            )
+
+    def delete(self, session_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def __len__(self):
+        row = self._conn().execute(
+            "SELECT COUNT(*) FROM sessions WHERE last_used >= ?",
+            (time.time() - self.idle_timeout,),
+        ).fetchone()
+        return row[0]
+
+
+def make_session_store():
+    """SESSION_STORE=memory (default) or sqlite (SESSION_DB, default sessions.db)."""
+    backend = os.getenv('SESSION_STORE', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.getenv('SESSION_DB', 'sessions.db'))
+    if backend != 'memory':
+        print(f"[SESSIONS] Unknown SESSION_STORE '{backend}', using memory")
+    return MemorySessionStore()
+
+
+sessions = make_session_store()
@@ -0,0 +1,60 @@
+import asyncio
+
+from rate_limit import HostLimiter
+
+
+def make_limiter(rate=2.0, max_concurrency=8):
+    return HostLimiter('www.emag.ro', rate, rate, max_concurrency)
+
+
+async def use_slot(limiter, hold):
+    async with limiter.slot():
+        await asyncio.sleep(hold)
+
+
+def test_cancelled_while_paced_releases_slot():
+    async def run():
+        limiter = make_limiter(rate=2.0)
+        # Burst is 1 token at 2 req/s, so most of these sleep in acquire()
+        tasks = [asyncio.ensure_future(use_slot(limiter, 0)) for _ in range(6)]
+        await asyncio.sleep(0.05)
+        assert limiter.in_flight > 1
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_inside_slot_releases_slot():
+    async def run():
+        limiter = make_limiter(rate=1000.0)
+        tasks = [asyncio.ensure_future(use_slot(limiter, 10)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        assert limiter.in_flight == 4
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0
+
+
+def test_slots_stay_usable_after_cancellations():
+    async def run():
+        limiter = make_limiter(rate=1000.0, max_concurrency=2)
+        for _ in range(5):
+            tasks = [asyncio.ensure_future(use_slot(limiter, 10)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # Would hang if cancelled tasks had leaked their slots
+        await asyncio.wait_for(use_slot(limiter, 0), timeout=2)
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.in_flight == 0
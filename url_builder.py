@@ -1,4 +1,4 @@
-import json
+from catalog import catalog_for, fold
 
 # Ordinea REALĂ a filtrelor eMAG, bazată pe UI
 FILTER_PRIORITY = [
@@ -17,41 +17,30 @@ FILTER_PRIORITY = [
     "livrat de",
     "disponibil in showroom"
 ]
-
-
-def load_emag_data():
-    with open("emag_filters_and_categories.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+FILTER_RANK = {name: i for i, name in enumerate(FILTER_PRIORITY)}
 
 
 def filter_priority(f):
-    name = f.get("filter_name", "").lower()
-    if name in FILTER_PRIORITY:
-        return FILTER_PRIORITY.index(name)
-    return 9999
+    return FILTER_RANK.get(fold(f.get("filter_name", "")), 9999)
 
 
-def build_emag_url_from_ai(ai_output, emag_data):
+def build_emag_url_from_ai(ai_output, emag_data=None):
+    # Indexul compilat al catalogului: lookup-uri O(1), fără diacritice/majuscule
+    catalog = catalog_for(emag_data)
 
     # -------------------------
     # 1. Categoria
     # -------------------------
-    selected_cat = next(
-        (c for c in emag_data["categories"]
-         if c["name"].lower() == ai_output["category"].lower()),
-        None
-    )
+    entry = catalog.category_index.get(fold(ai_output["category"]))
 
-    if not selected_cat:
+    if not entry:
         raise Exception(f"Categoria '{ai_output['category']}' nu există în JSON.")
 
-    category_path = selected_cat["url"]
-    category_path = category_path.split("https://www.emag.ro")[-1].split("?")[0]
+    selected_cat, url_parts = entry
+    if not url_parts:
+        raise Exception(f"URL invalid pentru categoria '{selected_cat['name']}'.")
 
-    parts = category_path.strip("/").split("/")
-    cat_label = "/".join(parts[:2])
-    cat_context = parts[2]
-    cat_end = parts[3]
+    cat_label, cat_context, cat_end = url_parts
 
     # -------------------------
     # 2. Sortăm filtrele după ordinea REALĂ eMAG
@@ -64,7 +53,7 @@ def build_emag_url_from_ai(ai_output, emag_data):
     # 3. Procesăm filtrele
     # -------------------------
     for f in sorted_filters:
-        fname = f.get("filter_name", "").lower()
+        fname = fold(f.get("filter_name", ""))
 
         # === PREȚ ===
         if fname == "pret":
@@ -86,18 +75,9 @@ def build_emag_url_from_ai(ai_output, emag_data):
         if not option:
             continue
 
-        option = option.lower()
-
-        if f["filter_name"] in emag_data["filters"]:
-            match = next(
-                (x for x in emag_data["filters"][f["filter_name"]]
-                 if x["label"].lower() == option),
-                None
-            )
-            if match:
-                raw = match["url_path"]
-                clean = raw.split("/filter/")[-1].split("/")[0]
-                filter_parts.append(clean)
+        slug = catalog.option_slugs.get((fname, fold(option)))
+        if slug:
+            filter_parts.append(slug)
 
     # -------------------------
     # 4. Construim URL-ul final
@@ -115,3 +95,18 @@ def build_emag_url_from_ai(ai_output, emag_data):
     final_url = final_url.replace("https:/", "https://")
 
     return final_url
+
+
+def canonical_search_url(url):
+    """
+    Cheie stabilă pentru un URL de căutare: fără query/fragment, lowercase,
+    segmentele de filtru sortate (ordinea opțiunilor alese de AI nu contează).
+    """
+    url = url.split("#")[0].split("?")[0].lower()
+    if "/filter/" not in url:
+        return url
+
+    head, tail = url.split("/filter/", 1)
+    parts = tail.split("/")
+    filters, rest = parts[:-2], parts[-2:]
+    return f"{head}/filter/{'/'.join(sorted(filters))}/{'/'.join(rest)}"
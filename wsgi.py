@@ -0,0 +1,40 @@
+"""
+Production entry point for the Flask API.
+
+    gunicorn -c gunicorn.conf.py wsgi:app     Linux / macOS, several workers
+    python wsgi.py                            waitress (threads, one process; Windows)
+
+Every worker process imports this module on its own, so state that has
+to be shared lives in SQLite: conversation sessions (SESSION_DB), the
+product / filters / results caches (CACHE_DB), the search history
+(HISTORY_DB), company facts (COMPANY_DB), scraped pages (HTTP_CACHE_DB)
+and search jobs (JOB_DB), so a job can be polled through any worker.
+All default to files in the working directory; set the variables to
+move them.
+"""
+import os
+
+os.environ.setdefault('SESSION_STORE', 'sqlite')
+os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+os.environ.setdefault('JOB_STORE', 'sqlite')
+
+from flask_api import create_app  # noqa: E402  (reads the settings above)
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+
+    if serve is None:
+        raise SystemExit("waitress is not installed: pip install waitress (or run gunicorn -c gunicorn.conf.py wsgi:app)")
+
+    serve(
+        app,
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', 5000)),
+        threads=int(os.getenv('WAITRESS_THREADS', 16)),
+    )